@@ -168,6 +168,8 @@ def get_retrieval_tool(llm: Any, docs: List[Any]):
 
 # --- Agent Factory ---
 
+AGENT_LLM_TAG = "business_agent_llm"
+
 def build_business_agent(docs: List[Any], chat_history_file: str = "chat_history.json"):
     """Builds and returns the AgentExecutor with persistent memory."""
     api_key = os.getenv("GOOGLE_API_KEY")
@@ -211,7 +213,9 @@ def build_business_agent(docs: List[Any], chat_history_file: str = "chat_history
     ])
     
     # 4. Create Agent
-    agent = create_tool_calling_agent(llm, tools, prompt)
+    # Tagged so streaming callers can tell the agent's own model output apart from
+    # the LLM calls nested inside tools and the memory summarizer.
+    agent = create_tool_calling_agent(llm, tools, prompt).with_config(tags=[AGENT_LLM_TAG])
     
     # 5. Agent Executor
     agent_executor = AgentExecutor(
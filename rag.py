@@ -260,6 +260,7 @@ from langchain_pinecone import PineconeVectorStore
 PINECONE_INDEX_NAME = "ai-bos"
 PINECONE_DIMENSION = 768
 MAX_UPSERT_BATCH_SIZE = 50
+MAX_CONCURRENT_UPSERTS = 4
 
 @with_retries
 def init_pinecone_index():
@@ -295,13 +296,15 @@ def init_pinecone_index():
 @with_retries
 async def upsert_batch_async(vectorstore: PineconeVectorStore, batch: List[Document]):
     """Async upsert a single batch using the vectorstore."""
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
     await loop.run_in_executor(None, vectorstore.add_documents, batch)
 
 async def upsert_documents_to_pinecone_async(chunks: List[Document]):
     """
-    Upsert documents into Pinecone asynchronously in batches of 50.
-    Validates chunks before uploading.
+    Upsert documents into Pinecone asynchronously in batches of 50,
+    embedding and upserting up to MAX_CONCURRENT_UPSERTS batches at once.
+    Validates chunks before uploading. If a batch fails, the batches still
+    pending are cancelled and the failing batch's error is re-raised.
     """
     if not chunks:
         logger.warning("No chunks to upsert.")
@@ -324,33 +327,47 @@ async def upsert_documents_to_pinecone_async(chunks: List[Document]):
     pc = PineconeClient(api_key=os.getenv("PINECONE_API_KEY"))
     index = pc.Index(PINECONE_INDEX_NAME)
     
+    loop = asyncio.get_running_loop()
+    sem = asyncio.Semaphore(MAX_CONCURRENT_UPSERTS)
     total_upserted = 0
-    # Process batches
-    for i in range(0, len(valid_chunks), MAX_UPSERT_BATCH_SIZE):
-        batch = valid_chunks[i:i + MAX_UPSERT_BATCH_SIZE]
+
+    async def _embed_and_upsert(batch: list[Document]):
+        nonlocal total_upserted
         texts = [doc.page_content for doc in batch]
-        metadatas = [doc.metadata for doc in batch]
         
         # 1. Embed the texts using our custom truncated `embed_text` function (forces 768)
         # Because we need exactly 768 dims for the AI-BOS Index.
-        vectors = embed_text(texts)
-        
-        # 2. Prepare Pinecone vector payloads
-        upsert_payload = []
-        for j, doc in enumerate(batch):
-            # ID is purely a hash of the content or random string
-            doc_id = str(hash(doc.page_content + str(doc.metadata.get("timestamp", ""))))
-            upsert_payload.append({
-                "id": doc_id,
-                "values": vectors[j],
-                "metadata": {"text": doc.page_content, **doc.metadata} # Pinecone needs text in metadata to retrieve it
-            })
+        # Both network calls run in the executor so batches overlap instead of queueing.
+        async with sem:
+            vectors = await loop.run_in_executor(None, embed_text, texts)
             
-        # 3. Upsert
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, index.upsert, upsert_payload)
+            # 2. Prepare Pinecone vector payloads
+            upsert_payload = []
+            for j, doc in enumerate(batch):
+                # ID is purely a hash of the content or random string
+                doc_id = str(hash(doc.page_content + str(doc.metadata.get("timestamp", ""))))
+                upsert_payload.append({
+                    "id": doc_id,
+                    "values": vectors[j],
+                    "metadata": {"text": doc.page_content, **doc.metadata} # Pinecone needs text in metadata to retrieve it
+                })
+                
+            # 3. Upsert
+            await loop.run_in_executor(None, index.upsert, upsert_payload)
         total_upserted += len(batch)
         logger.info("Upserted batch of %d. Total: %d/%d", len(batch), total_upserted, len(valid_chunks))
+
+    # Process batches, up to MAX_CONCURRENT_UPSERTS in flight at once.
+    # The TaskGroup cancels the remaining batches as soon as one fails.
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for i in range(0, len(valid_chunks), MAX_UPSERT_BATCH_SIZE):
+                tg.create_task(_embed_and_upsert(valid_chunks[i:i + MAX_UPSERT_BATCH_SIZE]))
+    except ExceptionGroup as eg:
+        logger.error("Upsert aborted after %d/%d chunks (%d batch(es) failed); remaining batches were cancelled.",
+                     total_upserted, len(valid_chunks), len(eg.exceptions))
+        # Surface the original error type to callers rather than the group
+        raise eg.exceptions[0] from eg
         
     logger.info("Successfully finished upserting %d chunks to Pinecone.", total_upserted)
 
@@ -377,7 +394,8 @@ def validate_rag_query(query: Any) -> str:
         
     return query
 
-def build_advanced_retriever(llm: Any, pinecone_index_name: str, docs: List[Document]):
+def build_advanced_retriever(llm: Any, pinecone_index_name: str, docs: List[Document],
+                             namespace: str | None = None):
     """
     Builds a nested retrieval architecture:
     1. MultiQueryRetriever (Generates 3 variants)
@@ -385,6 +403,9 @@ def build_advanced_retriever(llm: Any, pinecone_index_name: str, docs: List[Docu
     3. ParentDocumentRetriever (Small chunks search -> Big context return)
     4. Ensemble (BM25 + Vector)
     5. ContextualCompression (LLM Reranking)
+
+    ``namespace`` scopes the Pinecone vectors (e.g. to keep test documents out
+    of the production namespace); ``None`` uses the index's default namespace.
     """
     logger.info("Initializing super-retriever pipeline...")
     
@@ -394,7 +415,8 @@ def build_advanced_retriever(llm: Any, pinecone_index_name: str, docs: List[Docu
     vectorstore = PineconeVectorStore(
         index_name=pinecone_index_name,
         embedding=embeddings,
-        pinecone_api_key=os.getenv("PINECONE_API_KEY")
+        pinecone_api_key=os.getenv("PINECONE_API_KEY"),
+        namespace=namespace,
     )
 
     # --- 2. HyDE (Hypothetical Document Embedder) ---
@@ -0,0 +1,19 @@
+"""
+tests/conftest.py
+─────────────────
+Shared pytest hooks for the AI-BOS test suite.
+"""
+
+import asyncio
+import sys
+
+
+def pytest_asyncio_loop_factories(config, item):
+    """Run the asyncio tests on uvloop where available (not supported on Windows)."""
+    if sys.platform != "win32":
+        try:
+            import uvloop
+            return {"uvloop": uvloop.new_event_loop}
+        except ImportError:
+            pass
+    return {"asyncio": asyncio.new_event_loop}
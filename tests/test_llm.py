@@ -83,6 +83,72 @@ def test_validate_query_valid() -> None:
     assert result == "Hello"
 
 
+def test_with_retries_skips_non_transient_errors() -> None:
+    """
+    GIVEN a function that raises ValueError
+    WHEN it is wrapped with with_retries
+    THEN it should be called once and the error re-raised immediately.
+    """
+    from utils import with_retries
+
+    calls = []
+
+    @with_retries
+    def boom() -> None:
+        calls.append(1)
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError, match="bad input"):
+        boom()
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("wrapped", [False, True], ids=["direct", "via-cause"])
+def test_with_retries_retries_transient_errors(monkeypatch, wrapped) -> None:
+    """
+    GIVEN a function that fails with ConnectionError twice, then succeeds
+    WHEN it is wrapped with with_retries (directly or re-raised ``from`` an SDK error)
+    THEN it should be retried until it succeeds.
+    """
+    from utils import with_retries
+
+    calls = []
+
+    @with_retries
+    def flaky() -> str:
+        calls.append(1)
+        if len(calls) < 3:
+            err = ConnectionError("connection reset")
+            if wrapped:
+                raise RuntimeError("SDK call failed") from err
+            raise err
+        return "ok"
+
+    monkeypatch.setattr(flaky.retry, "sleep", lambda _seconds: None)  # skip the back-off
+    assert flaky() == "ok"
+    assert len(calls) == 3
+
+
+def test_with_retries_empty_retry_on_retries_nothing() -> None:
+    """
+    GIVEN with_retries(retry_on=()) wrapping a function that raises ConnectionError
+    WHEN it is called
+    THEN it should be called once, since an empty retry_on means retry nothing.
+    """
+    from utils import with_retries
+
+    calls = []
+
+    @with_retries(retry_on=())
+    def boom() -> None:
+        calls.append(1)
+        raise ConnectionError("connection reset")
+
+    with pytest.raises(ConnectionError):
+        boom()
+    assert len(calls) == 1
+
+
 def test_build_llm_without_key(monkeypatch) -> None:
     """
     GIVEN no GOOGLE_API_KEY in environment
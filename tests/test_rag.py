@@ -8,7 +8,9 @@ Run:
 """
 
 import os
+import re
 import sys
+import warnings
 import pytest
 
 # Ensure project root is importable
@@ -17,12 +19,57 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 load_dotenv()
 
-from rag import embed_text
+# Skip the whole module (rather than erroring at collection) if the RAG stack is not installed.
+embed_text = pytest.importorskip("rag").embed_text
 
-def test_embed_single_text():
+# Error-message patterns, compiled once and shared by the pytest.raises(match=...) checks.
+_EMPTY_RE = re.compile("empty")
+_NO_VALID_FILES_RE = re.compile("No valid files")
+_PINECONE_KEY_MISSING_RE = re.compile("PINECONE_API_KEY is missing")
+_TOO_SHORT_RE = re.compile("greater than 5 characters")
+_NOT_A_STRING_RE = re.compile("must be a string")
+
+# Tests that build a real LLM (Gemini + Pinecone). Deselected by default in pytest.ini.
+integration = pytest.mark.integration
+
+
+@pytest.fixture(scope="session")
+def cached_embed(pytestconfig):
+    """embed_text for single strings, persisted across runs in pytest's cache dir.
+
+    Entries are keyed by a fingerprint of the embedding path (model, target dimension
+    and the source of the embed/truncate functions) plus a hash of the text, so editing
+    any of those re-embeds instead of asserting on a stale vector. Without the
+    cacheprovider plugin (-p no:cacheprovider) it calls the API.
+    """
+    import hashlib
+    import inspect
+
+    import rag
+
+    cache = getattr(pytestconfig, "cache", None)
+    fingerprint = hashlib.sha256("\n".join([
+        rag.EMBEDDING_MODEL, str(rag.PINECONE_DIMENSION),
+        inspect.getsource(rag.embed_text), inspect.getsource(rag._embed_batch),
+    ]).encode()).hexdigest()[:16]
+
+    def _embed(text):
+        if cache is None:
+            return embed_text(text)
+        key = f"rag/embeddings/{fingerprint}/{hashlib.sha256(text.encode()).hexdigest()}"
+        embedding = cache.get(key, None)
+        if embedding is None:
+            embedding = embed_text(text)
+            cache.set(key, embedding)
+        return embedding
+
+    return _embed
+
+
+def test_embed_single_text(cached_embed):
     """Test embedding a single valid string returns 768 dimensions."""
     text = "Hello world, this is a test."
-    embedding = embed_text(text)
+    embedding = cached_embed(text)
     
     assert isinstance(embedding, list)
     assert len(embedding) == 768
@@ -41,7 +88,7 @@ def test_embed_batch_texts():
 
 def test_embed_empty_string():
     """Test that embedding an empty string raises ValueError."""
-    with pytest.raises(ValueError, match="empty"):
+    with pytest.raises(ValueError, match=_EMPTY_RE):
         embed_text("   ")
 
 def test_embed_empty_list():
@@ -65,53 +112,45 @@ def test_lru_cache_working():
     # But checking equality is safer
     assert emb1 == emb2
 
-import tempfile
-from rag import load_and_chunk_files
-
-def test_load_and_chunk_files_valid_txt():
+def test_load_and_chunk_files_valid_txt(tmp_path):
     """Test loading and chunking a valid temporary text file."""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-        f.write("This is a test document.\n\nIt has multiple lines.\n" * 100)
-        tmp_path = f.name
-        
-    try:
-        chunks = load_and_chunk_files([tmp_path])
-        assert len(chunks) > 0, "Should generate at least one chunk."
-        
-        for c in chunks:
-            assert len(c.page_content.strip()) > 0, "No empty chunks allowed."
-            assert "source" in c.metadata, "Metadata must contain 'source'."
-            assert "timestamp" in c.metadata, "Metadata must contain 'timestamp'."
-            assert c.metadata["source"] == tmp_path
-    finally:
-        os.remove(tmp_path)
+    from rag import load_and_chunk_files
+    p = tmp_path / "doc.txt"
+    p.write_text("This is a test document.\n\nIt has multiple lines.\n" * 100)
+
+    chunks = load_and_chunk_files([str(p)])
+    assert len(chunks) > 0, "Should generate at least one chunk."
+
+    for c in chunks:
+        assert len(c.page_content.strip()) > 0, "No empty chunks allowed."
+        assert "source" in c.metadata, "Metadata must contain 'source'."
+        assert "timestamp" in c.metadata, "Metadata must contain 'timestamp'."
+        assert c.metadata["source"] == str(p)
 
 def test_load_and_chunk_files_empty_list():
     """Test that passing an empty list returns an empty list."""
+    from rag import load_and_chunk_files
     chunks = load_and_chunk_files([])
     assert chunks == []
 
 def test_load_and_chunk_files_invalid_path():
     """Test that non-existent files are skipped, and if none exist, raises ValueError."""
-    import pytest
-    with pytest.raises(ValueError, match="No valid files"):
+    from rag import load_and_chunk_files
+    with pytest.raises(ValueError, match=_NO_VALID_FILES_RE):
         load_and_chunk_files(["/path/to/nowhere.txt"])
 
-def test_load_and_chunk_files_unsupported_ext():
+def test_load_and_chunk_files_unsupported_ext(tmp_path):
     """Test graceful handling (or error) for unsupported extensions."""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.xyz', delete=False) as f:
-        f.write("Some data")
-        tmp_path = f.name
-        
-    try:
-        # Currently, our code will use sync fallback and fail, then log error. 
-        # But wait, it might raise ValueError from `_get_loader_for_file`.
-        # Let's just ensure it handles the error and we get back an empty list 
-        # (since the exception is caught in the gather loop and sync fallback loop)
-        chunks = load_and_chunk_files([tmp_path])
-        assert chunks == []
-    finally:
-        os.remove(tmp_path)
+    from rag import load_and_chunk_files
+    p = tmp_path / "doc.xyz"
+    p.write_text("Some data")
+
+    # Currently, our code will use sync fallback and fail, then log error. 
+    # But wait, it might raise ValueError from `_get_loader_for_file`.
+    # Let's just ensure it handles the error and we get back an empty list 
+    # (since the exception is caught in the gather loop and sync fallback loop)
+    chunks = load_and_chunk_files([str(p)])
+    assert chunks == []
 
 @pytest.mark.asyncio
 async def test_upsert_pinecone_missing_key_skipped():
@@ -124,63 +163,212 @@ async def test_upsert_pinecone_missing_key_skipped():
     if not key or key == "replace_with_pinecone_key":
         # Fake a document
         dummy_chunk = [Document(page_content="test", metadata={"source": "test"})]
-        with pytest.raises(EnvironmentError, match="PINECONE_API_KEY is missing"):
+        with pytest.raises(EnvironmentError, match=_PINECONE_KEY_MISSING_RE):
             await upsert_documents_to_pinecone_async(dummy_chunk)
     else:
         pytest.skip("Valid Pinecone key present. Not testing missing key behavior.")
 
+@pytest.fixture
+def stub_pinecone(monkeypatch):
+    """Swap Pinecone and the embedder for in-process stubs; returns the stub index."""
+    import threading
+    import time
+
+    import rag
+
+    class StubIndex:
+        def __init__(self):
+            self.lock = threading.Lock()
+            self.in_flight = self.max_in_flight = 0
+            self.upserted = []
+            self.fail_on_call = None
+
+        def embed(self, texts):
+            with self.lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            time.sleep(0.02)
+            return [[0.0] * rag.PINECONE_DIMENSION for _ in texts]
+
+        def upsert(self, payload):
+            with self.lock:
+                self.in_flight -= 1
+                call = len(self.upserted)
+                self.upserted.append(payload)
+            if call == self.fail_on_call:
+                raise RuntimeError("upsert failed")
+
+    index = StubIndex()
+    monkeypatch.setenv("PINECONE_API_KEY", "stub")
+    monkeypatch.setattr(rag, "init_pinecone_index", lambda: None)
+    monkeypatch.setattr(rag, "get_embeddings_client", lambda: None)
+    monkeypatch.setattr(rag, "embed_text", index.embed)
+    monkeypatch.setattr(rag, "PineconeClient", lambda api_key: type("PC", (), {"Index": lambda self, name: index})())
+    return index
+
+def _chunks(n):
+    from langchain_core.documents import Document
+    return [Document(page_content=f"chunk {i}", metadata={"source": "stub"}) for i in range(n)]
+
+@pytest.mark.asyncio
+async def test_upsert_bounds_concurrent_batches(stub_pinecone):
+    """No more than MAX_CONCURRENT_UPSERTS batches may be in flight at once."""
+    from rag import MAX_CONCURRENT_UPSERTS as LIMIT
+    from rag import MAX_UPSERT_BATCH_SIZE as BATCH
+    from rag import upsert_documents_to_pinecone_async as upsert
+
+    n_batches = LIMIT * 3
+    await upsert(_chunks(n_batches * BATCH))
+
+    assert len(stub_pinecone.upserted) == n_batches
+    assert 1 < stub_pinecone.max_in_flight <= LIMIT
+
+@pytest.mark.asyncio
+async def test_upsert_failure_cancels_pending_batches(stub_pinecone):
+    """A failing batch re-raises its error and the batches not yet started are cancelled."""
+    from rag import MAX_CONCURRENT_UPSERTS as LIMIT
+    from rag import MAX_UPSERT_BATCH_SIZE as BATCH
+    from rag import upsert_documents_to_pinecone_async as upsert
+
+    n_batches = LIMIT * 5
+    stub_pinecone.fail_on_call = 1
+    with pytest.raises(RuntimeError, match="upsert failed"):
+        await upsert(_chunks(n_batches * BATCH))
+
+    # Only batches already holding the semaphore when the failure hit may still land
+    assert len(stub_pinecone.upserted) < 2 * LIMIT
+
 def test_validate_rag_query_valid():
     from rag import validate_rag_query
     assert validate_rag_query("What is IntelForge?") == "What is IntelForge?"
 
 def test_validate_rag_query_too_short():
     from rag import validate_rag_query
-    with pytest.raises(ValueError, match="greater than 5 characters"):
+    with pytest.raises(ValueError, match=_TOO_SHORT_RE):
         validate_rag_query("Hi")
 
 def test_validate_rag_query_invalid_type():
     from rag import validate_rag_query
-    with pytest.raises(TypeError, match="must be a string"):
+    with pytest.raises(TypeError, match=_NOT_A_STRING_RE):
         validate_rag_query(123)
 
-@pytest.mark.asyncio
-async def test_retrieval_diversity():
-    """Verify that the retriever returns unique documents."""
-    from rag import build_advanced_retriever, build_rag_chain
-    from main import build_llm
+@pytest.fixture(scope="module")
+def retriever_factory():
+    """Build the LLM once and return a helper that builds a retriever over given docs.
+
+    Documents go into a throwaway Pinecone namespace that is deleted on teardown,
+    so integration runs never leave synthetic vectors in the production namespace.
+    """
+    import uuid
+
+    from rag import PINECONE_INDEX_NAME, build_advanced_retriever
+    build_llm = pytest.importorskip("main").build_llm
+
+    # Note: Requires GOOGLE_API_KEY and PINECONE_API_KEY in env
+    try:
+        llm = build_llm()
+    except Exception as e:
+        pytest.skip(f"Skipping retrieval tests due to API/Env constraints: {e}")
+
+    namespace = f"pytest-{uuid.uuid4().hex[:12]}"
+
+    def _build(docs):
+        try:
+            return build_advanced_retriever(llm, PINECONE_INDEX_NAME, docs, namespace=namespace)
+        except Exception as e:  # noqa: BLE001 - any API/env failure skips, as for build_llm above
+            pytest.skip(f"Skipping retrieval tests due to API/Env constraints: {e}")
+
+    yield _build
+
+    from pinecone import Pinecone
+    from pinecone.exceptions import NotFoundException, PineconeException
+    try:
+        Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(PINECONE_INDEX_NAME).delete(
+            delete_all=True, namespace=namespace
+        )
+    except NotFoundException:
+        pass  # every build above was skipped, so the namespace was never created
+    except PineconeException as e:
+        warnings.warn(f"Could not delete test namespace {namespace}: {e}", stacklevel=1)
+
+@pytest.fixture(scope="module")
+def retriever(retriever_factory):
+    """Build the advanced retriever once and share it across the retrieval tests."""
     from langchain_core.documents import Document
-    
-    docs = [
+
+    return retriever_factory([
         Document(page_content="The blue car is fast.", metadata={"source": "car.txt"}),
         Document(page_content="The red bike is slow.", metadata={"source": "bike.txt"}),
         Document(page_content="The green boat is large.", metadata={"source": "boat.txt"})
-    ]
-    llm = build_llm()
-    # Note: Requires PINECONE_API_KEY in env
-    try:
-        retriever = build_advanced_retriever(llm, "ai-bos", docs)
-        # We check if retriever is built without nulls
-        assert retriever is not None
-    except Exception as e:
-        pytest.skip(f"Skipping diversity test due to API/Env constraints: {e}")
+    ])
+
+@integration
+@pytest.mark.asyncio
+@pytest.mark.parametrize("n", [10, 100, 1000])
+async def test_retrieval_diversity(n, retriever_factory):
+    """Verify that the retriever returns unique documents across corpus sizes."""
+    from langchain_core.documents import Document
+
+    docs = [Document(page_content=f"doc {i}", metadata={"source": f"s{i}"}) for i in range(n)]
+    r = retriever_factory(docs)
+    assert r is not None
+    out = await r.ainvoke("query")
+    assert len({d.page_content for d in out}) == len(out)
+
+@integration
+@pytest.mark.asyncio
+async def test_retrieval_results_unique(retriever):
+    """Verify that the retriever returns unique documents."""
+    out = await retriever.ainvoke("Which vehicle is fast?")
+    assert len({d.page_content for d in out}) == len(out)
 
 @pytest.mark.asyncio
 async def test_async_chain_invocation():
-    """Stress test the chain with ainvoke."""
-    from main import build_llm
-    from rag import build_rag_chain
+    """Stress test the chain with concurrent ainvoke calls."""
+    import asyncio
+    from typing import ClassVar
+
     from langchain_core.documents import Document
+    from langchain_core.language_models.llms import LLM
     from langchain_core.retrievers import BaseRetriever
-    from typing import List
+
+    from rag import build_rag_chain
+
+    in_flight = peak = 0
 
     class DummyRetriever(BaseRetriever):
-        def _get_relevant_documents(self, query: str) -> List[Document]:
-            return [Document(page_content="test")]
+        # Built once and shared by every call so repeated ainvoke() calls don't allocate.
+        _docs: ClassVar[list[Document]] = [Document(page_content="test")]
 
-    llm = build_llm()
-    chain = build_rag_chain(llm, DummyRetriever())
-    
-    assert hasattr(chain, "ainvoke")
-    
-    # We just ensure the call structure is valid for async
-    assert hasattr(chain, "ainvoke")
+        def _get_relevant_documents(self, query: str) -> list[Document]:
+            return self._docs
+
+        async def _aget_relevant_documents(self, query: str) -> list[Document]:
+            return self._docs
+
+    class FakeLLM(LLM):
+        """Stand-in LLM that records how many calls overlap, so concurrency is checked without timing."""
+
+        @property
+        def _llm_type(self) -> str:
+            return "fake"
+
+        def _call(self, prompt: str, stop: list[str] | None = None, **kwargs) -> str:
+            return "ok"
+
+        async def _acall(self, prompt: str, stop: list[str] | None = None, **kwargs) -> str:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)  # stay in flight long enough for the other calls to arrive
+            in_flight -= 1
+            return "ok"
+
+    chain = build_rag_chain(FakeLLM(), DummyRetriever())
+    queries = ["q" + str(i) for i in range(16)]
+
+    results = await asyncio.gather(*(chain.ainvoke({"query": q}) for q in queries))
+
+    assert [r["result"] for r in results] == ["ok"] * len(queries)
+    # Serial execution never has more than one LLM call in flight; require real overlap.
+    assert peak > 1
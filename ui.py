@@ -5,15 +5,21 @@ Premium production-grade Streamlit UI.
 5 pages: Dashboard | Data Ingestion | AI Assistant | Reports | Admin
 """
 
-import os, sys, time, json, asyncio, datetime, random
-import pandas as pd
-import plotly.graph_objects as go
+import os, sys, re, time, json, asyncio, datetime, random, threading, shutil, tempfile, itertools
+import importlib.util
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from types import MappingProxyType
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 from dotenv import load_dotenv
 
 # ── Bootstrap ──────────────────────────────────────────────────────────────────
 load_dotenv()
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from utils import get_logger
+
+logger = get_logger("ui")
 
 # ── Page Config ────────────────────────────────────────────────────────────────
 st.set_page_config(
@@ -24,21 +30,42 @@ st.set_page_config(
 )
 
 # ── Demo Data Init ─────────────────────────────────────────────────────────────
-if "demo_data_checked" not in st.session_state:
-    st.session_state.demo_data_checked = True
-    try:
-        import demo_data_generator as ddg
-        if ddg.is_demo_needed():
-            with st.spinner("🚀 AI-BOS First Launch: Generating demo business data..."):
+@st.cache_resource(show_spinner=False)
+def _start_demo_generation():
+    """Generate demo data on a daemon thread, once per process. Returns a status dict."""
+    status = {"done": False}
+
+    def _run():
+        try:
+            import demo_data_generator as ddg
+            if ddg.is_demo_needed():
                 ddg.generate_all()
-    except Exception as e:
-        print(f"Demo data generator failed: {e}")
+        except Exception:
+            logger.exception("Demo data generation failed")
+        finally:
+            status["done"] = True
+
+    threading.Thread(target=_run, daemon=True).start()
+    return status
+
+@st.fragment(run_every=1)
+def _demo_banner():
+    """Poll the generator each second; only this banner reruns while it works."""
+    if _demo_status["done"]:
+        st.session_state._demo_progress = True
+        st.rerun()  # one full run once the data exists, which also drops the banner
+    st.info("🚀 AI-BOS First Launch: Generating demo business data in the background...")
+
+_demo_status = _start_demo_generation()
+st.session_state._demo_progress = _demo_status["done"]
+if not st.session_state._demo_progress:
+    _demo_banner()
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # THEME CSS
 # ══════════════════════════════════════════════════════════════════════════════
-CSS = """
+_CSS_RAW = """
 <style>
 @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
 * { box-sizing: border-box; }
@@ -97,6 +124,8 @@ html, body, [class*="css"] { font-family: 'Inter', sans-serif !important; }
 .page-header p { color: #94A3B8 !important; margin: 0; font-size: 0.9rem; }
 
 /* ── Glassmorphic Metric Cards ── */
+.card-row { display: flex; gap: 1rem; }
+.card-row > .metric-card { flex: 1 1 0; min-width: 0; }
 .metric-card {
     background: rgba(13, 59, 107, 0.35);
     backdrop-filter: blur(12px);
@@ -126,6 +155,21 @@ html, body, [class*="css"] { font-family: 'Inter', sans-serif !important; }
 .delta-up   { background: rgba(16,185,129,0.18); color: #34D399; border: 1px solid rgba(16,185,129,0.3); }
 .delta-down { background: rgba(239,68,68,0.18);  color: #F87171; border: 1px solid rgba(239,68,68,0.3); }
 
+/* ── Gauge Ring (Pinecone fullness) ── */
+.gauge-ring {
+    width: 150px; height: 150px; margin: 14px auto 18px auto; border-radius: 50%;
+    display: flex; align-items: center; justify-content: center;
+    box-shadow: 0 0 24px rgba(0,212,255,0.15);
+}
+.gauge-ring-inner {
+    width: 118px; height: 118px; border-radius: 50%; background: #0F172A;
+    display: flex; flex-direction: column; align-items: center; justify-content: center;
+}
+.gauge-ring-label {
+    color: #64748B !important; font-size: 0.7rem; font-weight: 600;
+    text-transform: uppercase; letter-spacing: 0.08em; margin-top: 6px;
+}
+
 /* ── Section Headers ── */
 .section-h {
     color: #E2E8F0 !important; font-size: 1.05rem; font-weight: 700;
@@ -169,6 +213,9 @@ html, body, [class*="css"] { font-family: 'Inter', sans-serif !important; }
     box-shadow: 0 3px 12px rgba(0,0,0,0.3); line-height: 1.6;
 }
 .chat-meta { font-size:0.72rem; color:#64748B !important; margin-top:5px; display:flex; align-items:center; gap:8px; }
+/* New answers are revealed top-down in the browser, no per-chunk server writes */
+.chat-bubble-bot.reveal { animation: reveal-text 1.2s ease-out both; }
+@keyframes reveal-text { from{clip-path:inset(0 0 100% 0)} to{clip-path:inset(0 0 0 0)} }
 
 /* ── Typing Indicator ── */
 .typing-dot {
@@ -479,6 +526,8 @@ hr { border-color: rgba(0,212,255,0.1) !important; }
     .page-header p  { font-size: 0.8rem !important; }
 
     /* Metric cards — stack to 2x2 on mobile */
+    .card-row { flex-wrap: wrap; gap: 12px; }
+    .card-row > .metric-card { flex: 1 1 calc(50% - 6px); }
     .metric-card {
         min-height: 120px !important;
         padding: 16px 12px !important;
@@ -563,22 +612,94 @@ hr { border-color: rgba(0,212,255,0.1) !important; }
 </style>
 """
 
+@st.cache_data(show_spinner=False)
+def _minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace once per process, not on every rerun."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+CSS = _minify_css(_CSS_RAW)
+
+# Emitted on every full run on purpose: Streamlit removes any element a rerun
+# doesn't re-emit, so gating this behind a session_state flag drops the theme
+# after the first interaction. Minification above keeps the payload small.
 st.markdown(CSS, unsafe_allow_html=True)
 
+# ══════════════════════════════════════════════════════════════════════════════
+# STATIC HTML — built once at import; only per-rerun data stays in f-strings
+# ══════════════════════════════════════════════════════════════════════════════
+_PAGE_HEADER = """<div class="page-header">
+    <h1>{}</h1>
+    <p>{}</p>
+</div>"""
+
+_HDR_DASHBOARD = _PAGE_HEADER.format("🧠 AI-BOS Business Brain",
+                                     "Intelligent Business Operations System • Real-time Knowledge Pipeline")
+_HDR_INGESTION = _PAGE_HEADER.format("📂 Data Ingestion Hub",
+                                     "Index documents and connect live data sources to your knowledge base")
+_HDR_ASSISTANT = _PAGE_HEADER.format("💬 AI Business Assistant",
+                                     "Powered by Gemini 2.0 Flash • RAG-enhanced with your business knowledge")
+_HDR_REPORTS   = _PAGE_HEADER.format("📊 Reports Generator",
+                                     "AI-powered business intelligence reports with interactive charts")
+_HDR_ADMIN     = _PAGE_HEADER.format("🔧 Admin Panel",
+                                     "Secure system configuration, logs, and diagnostics")
+
+_CHAT_EMPTY_HTML = """<div style="text-align:center;padding:36px 0 8px 0;">
+    <div style="font-size:3.5rem;margin-bottom:8px;">🧠</div>
+    <div style="font-size:1.2rem;font-weight:600;color:#CBD5E1;">Your Business Brain is ready</div>
+    <div style="font-size:0.85rem;color:#475569;margin-top:6px;">
+        Ask anything about your deals, emails, or company knowledge
+    </div>
+</div>"""
+_TRY_ASKING_HTML = '<div class="section-h" style="text-align:center;">💡 Try asking...</div>'
+
+_NL_TO_BR = str.maketrans({"\n": "<br>"})
+_SEARCH_RESULT_TMPL = """<div class="search-result">
+    <div style="display:flex;justify-content:space-between;margin-bottom:10px;">
+        <span style="color:#00D4FF;font-weight:600;">🔍 Results for: "{query}"</span>
+        <span style="color:#475569;font-size:0.78rem;">{time}</span>
+    </div>
+    <div style="color:#CBD5E1;line-height:1.7;">{answer}</div>
+</div>"""
+
+_FOOTER_HTML = """<div class="aibos-footer">
+    <div class="footer-badges">
+        <span class="f-badge">🟦 Streamlit 1.56</span>
+        <span class="f-badge">🦜 LangChain 0.3</span>
+        <span class="f-badge">✨ Gemini 2.0 Flash</span>
+        <span class="f-badge">🌲 Pinecone</span>
+        <span class="f-badge">🔒 PII Anonymized</span>
+    </div>
+    <div style="margin-top:10px;">
+        AI-BOS v2.0 &nbsp;|&nbsp; Made with ❤️ for showcase
+        &nbsp;|&nbsp; <a href="https://github.com" target="_blank">GitHub</a>
+        &nbsp;|&nbsp; <span style="color:#00D4FF;">IntelForge Engine</span>
+    </div>
+</div>
+"""
+
 # ══════════════════════════════════════════════════════════════════════════════
 # SESSION STATE
 # ══════════════════════════════════════════════════════════════════════════════
+_HISTORY_MAX = 500  # chat turns / search log entries kept per session; older ones drop off
+
 DEFAULTS = {
     "dark_mode": True,
-    "chat_history": [],
+    "chat_history": deque(maxlen=_HISTORY_MAX),
     "ingested_files": [],
+    "ingested_files_df": None,
+    "ingested_names": set(),
     "connector_status": {"Gmail": False, "Slack": False, "CRM": False},
     "total_docs": 47,
     "vectors_indexed": 1247,
     "report_output": None,
     "feedback_log": [],
     "admin_unlocked": False,
-    "query_log": [],
+    "query_log": deque(maxlen=_HISTORY_MAX),
+    "sync_state": {"gmail": 0.0, "slack": 0.0, "crm": 0.0, "files": 0.0},
     "cfg_model": "gemini-2.0-flash",
     "cfg_chunk": 512,
     "cfg_temp": 0.3,
@@ -587,7 +708,8 @@ DEFAULTS = {
 }
 for k, v in DEFAULTS.items():
     if k not in st.session_state:
-        st.session_state[k] = v
+        # Copy mutable defaults so sessions never share (and append into) one object
+        st.session_state[k] = v.copy() if isinstance(v, (list, dict, set, deque)) else v
 
 # ══════════════════════════════════════════════════════════════════════════════
 # HELPERS
@@ -595,19 +717,47 @@ for k, v in DEFAULTS.items():
 def ts():
     return datetime.datetime.now().strftime("%H:%M")
 
-DEMO_ANSWERS = {
+def _rerun_page():
+    """Rerun only the current page fragment, or the whole app when this run wasn't fragment-scoped."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+DEMO_ANSWERS = MappingProxyType({
     "deal":    "📊 **Top CRM Deals Pipeline:**\n\n| Company | Value | Stage |\n|---------|-------|-------|\n| Gamma AI Labs | $750K | Contract Review 🔥 |\n| Acme Technologies | $500K | Negotiation |\n| Epsilon Healthcare | $400K | Pilot |\n| Beta Ventures | $280K | Proposal Sent |\n\n**Total pipeline: $2.86M** across 10 active deals.",
     "email":   "📧 **Gmail Summary (Last 5 messages):**\n\n1. 🔐 **Google Security Alert** — AI Employee access granted to your account\n2. 📈 **Grammarly** — Weekly productivity stats & new AI tones\n3. 📦 More notifications in queue\n\n*All PII anonymized before indexing.* ✅",
     "swot":    "## SWOT Analysis — IntelForge\n\n**✅ Strengths:**\n- Multi-source RAG pipeline (Gmail + Slack + CRM)\n- Real-time Pinecone indexing with PII anonymization\n- Gemini 2.0 Flash for fast, accurate responses\n\n**⚠️ Weaknesses:**\n- Slack free plan API limitations\n- No mobile app yet\n\n**🚀 Opportunities:**\n- $1.15M in healthcare & AI deals pending\n- Enterprise contract pipeline growing 34% QoQ\n\n**🔴 Threats:**\n- Competitor AI BI tools (Microsoft Copilot)\n- API rate limits on free tiers",
     "kpi":     "📈 **KPI Dashboard — Current Quarter:**\n\n| Metric | Value | Change |\n|--------|-------|--------|\n| Total Pipeline | $2.86M | ↑ +18% |\n| Deals Won | 3 | ↑ +1 |\n| Conversion Rate | 34% | ↑ +4% |\n| Avg Deal Size | $286K | ↑ +12% |\n| Hot Leads | 2 | Gamma AI, Acme |\n\n*Data sourced from CRM + Gmail + Slack.*",
     "slack":   "💬 **Slack Activity Summary:**\n\nChannel `#intelforge-bot` — 1 message indexed\n- Bot joined the channel at 04:10 AM ✅\n- No messages yet — send a message to index it!\n\n*Tip: Post deal updates in the channel for AI retrieval.*",
-}
-
+})
+_DEMO_KEYS = tuple((k.lower(), v) for k, v in DEMO_ANSWERS.items())
+
+try:
+    import ahocorasick  # optional: single-pass keyword matching for get_answer
+except ImportError:
+    ahocorasick = None
+
+@st.cache_resource(show_spinner=False)
+def _demo_automaton():
+    """Aho-Corasick automaton over _DEMO_KEYS; values carry dict order for precedence."""
+    automaton = ahocorasick.Automaton()
+    for rank, (k, v) in enumerate(_DEMO_KEYS):
+        automaton.add_word(k, (rank, v))
+    automaton.make_automaton()
+    return automaton
+
+@st.cache_data(max_entries=256, show_spinner=False)
 def get_answer(question: str) -> str:
     lower = question.lower()
-    for k, v in DEMO_ANSWERS.items():
-        if k in lower:
-            return v
+    if ahocorasick is not None:
+        hits = [hit for _, hit in _demo_automaton().iter(lower)]
+        if hits:
+            return min(hits)[1]
+    else:
+        for k, v in _DEMO_KEYS:
+            if k in lower:
+                return v
     return (
         f"🧠 I searched your full knowledge base for **\"{question}\"**.\n\n"
         "Based on your indexed documents:\n"
@@ -618,38 +768,361 @@ def get_answer(question: str) -> str:
         "Add more documents via Data Ingestion to improve accuracy."
     )
 
-def stream_answer(text: str):
-    """Yield words for streaming effect."""
-    for word in text.split(" "):
-        yield word + " "
-        time.sleep(0.025)
+@st.cache_resource(show_spinner="Initializing AI agent...")
+def _get_agent():
+    """One business agent per process; agent (and its LangChain/Gemini imports) load on first chat."""
+    from agent import build_business_agent
+    return build_business_agent(docs=[])
+
+@st.cache_resource(show_spinner=False)
+def _agent_loop():
+    """One long-lived event loop for the cached agent; its async Gemini client binds to the first loop it runs on."""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True, name="agent-loop").start()
+    return loop
+
+async def _agent_events(agent, question: str):
+    """Yield answer text from the agent's own model, skipping tool-call chunks and LLM calls nested in tools/memory."""
+    from agent import AGENT_LLM_TAG
+    async for event in agent.astream_events({"input": question}, version="v2"):
+        if event["event"] != "on_chat_model_stream" or AGENT_LLM_TAG not in event.get("tags", ()):
+            continue
+        chunk = event["data"]["chunk"]
+        if isinstance(chunk.content, str) and chunk.content and not chunk.tool_call_chunks:
+            yield chunk.content
+
+def _agent_token_stream(agent, question: str):
+    """Sync generator for st.write_stream that drives _agent_events on _agent_loop()."""
+    loop = _agent_loop()
+    events = _agent_events(agent, question)
+
+    async def _next():
+        try:
+            return await events.__anext__()
+        except StopAsyncIteration:
+            return None
 
-def get_pinecone_stats():
     try:
-        from pinecone import Pinecone as PC
-        pc = PC(api_key=os.getenv("PINECONE_API_KEY",""))
-        idx_name = "business-intelligence"
-        names = [i.name for i in pc.list_indexes()]
-        if idx_name in names:
-            stats = pc.Index(idx_name).describe_index_stats()
-            return {
-                "total_vectors": stats.get("total_vector_count", 0),
-                "dimension": stats.get("dimension", 768),
-                "fullness": stats.get("index_fullness", 0.0),
-            }
+        while (token := asyncio.run_coroutine_threadsafe(_next(), loop).result()) is not None:
+            yield token
+    finally:
+        asyncio.run_coroutine_threadsafe(events.aclose(), loop).result()
+
+@st.cache_resource(show_spinner=False)
+def _get_pc_client():
+    """One Pinecone client per process, so the TLS handshake isn't repeated on every rerun."""
+    from pinecone import Pinecone as PC
+    return PC(api_key=os.getenv("PINECONE_API_KEY",""))
+
+@st.cache_resource(show_spinner=False)
+def _get_pc_index(name: str = "business-intelligence"):
+    """Index handle on the shared client, so its connection pool stays warm across reruns."""
+    return _get_pc_client().Index(name)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_pinecone_stats():
+    """Index stats snapshot shared by all sessions, refreshed at most once a minute; None when unavailable."""
+    if not os.getenv("PINECONE_API_KEY"):
+        return None
+    try:
+        stats = _get_pc_index().describe_index_stats()
+        return {
+            "total_vectors": stats.get("total_vector_count", 0),
+            "dimension": stats.get("dimension", 768),
+            "fullness": stats.get("index_fullness", 0.0),
+        }
     except Exception:
-        pass
-    return {"total_vectors": st.session_state.vectors_indexed, "dimension": 768, "fullness": 0.12}
-
-CHART_LAYOUT = dict(
-    paper_bgcolor="rgba(0,0,0,0)",
-    plot_bgcolor="rgba(0,0,0,0)",
-    font=dict(family="Inter", color="#94A3B8"),
-    margin=dict(t=20, b=10, l=0, r=0),
-    xaxis=dict(gridcolor="rgba(255,255,255,0.05)", tickfont=dict(color="#64748B")),
-    yaxis=dict(gridcolor="rgba(255,255,255,0.05)", tickfont=dict(color="#64748B")),
+        logger.warning("Pinecone stats unavailable", exc_info=True)
+        return None
+
+def get_pinecone_stats():
+    """Live index stats, or this session's local vector count when Pinecone isn't reachable."""
+    return _fetch_pinecone_stats() or {
+        "total_vectors": st.session_state.vectors_indexed, "dimension": 768, "fullness": 0.12,
+    }
+
+def _chunk_upload(upload) -> list:
+    """Chunk one uploaded file with the rag loaders; returns its chunks, sourced to the upload's name."""
+    from rag import process_file_sync_fallback
+    upload.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=os.path.splitext(upload.name)[1], delete=False) as tmp:
+        shutil.copyfileobj(upload, tmp)  # stream from the upload's handle, no full .read() copy
+    try:
+        chunks = process_file_sync_fallback(tmp.name)
+    finally:
+        os.unlink(tmp.name)
+    for chunk in chunks:
+        chunk.metadata["source"] = upload.name
+    return chunks
+
+async def _pull(src: str, label: str, delay: float):
+    """Stand-in for one connector pull (Gmail/Slack/CRM/files)."""
+    await asyncio.sleep(delay)
+    return src, label
+
+def _run_reindex(pulls, finish, prog, ph):
+    """Run connector pulls concurrently, then the sequential chunk/upsert steps, updating prog/ph.
+
+    Each source's last sync time is recorded in session_state.sync_state.
+    """
+    total = len(pulls) + len(finish)
+    sync_state = st.session_state.sync_state
+
+    async def _go():
+        done = 0
+        if pulls:
+            ph.info("⚡ Pulling " + " • ".join(label for _, label, _ in pulls) + " in parallel...")
+        for fut in asyncio.as_completed([_pull(src, label, dl) for src, label, dl in pulls]):
+            src, label = await fut
+            sync_state[src] = time.time()
+            done += 1
+            prog.progress(done/total, text=f"{label} ✓")
+        for msg, dl in finish:
+            ph.info(msg)
+            await asyncio.sleep(dl)
+            done += 1
+            prog.progress(done/total)
+
+    asyncio.run(_go())
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _connector_status():
+    """Connector credentials check; cleared on re-index so fresh credentials show up."""
+    return {
+        "Gmail": os.path.exists("token.json"),
+        "Slack": bool(os.getenv("SLACK_BOT_TOKEN")),
+        "CRM":   os.path.exists("crm_data.json"),
+    }
+
+@st.cache_resource(show_spinner=False)
+def _env_display():
+    """Masked env values for the Admin overview; the environment is fixed once dotenv has loaded."""
+    env_vars = {
+        "GOOGLE_API_KEY":   os.getenv("GOOGLE_API_KEY"),
+        "PINECONE_API_KEY": os.getenv("PINECONE_API_KEY"),
+        "SLACK_BOT_TOKEN":  os.getenv("SLACK_BOT_TOKEN"),
+        "SLACK_CHANNEL_ID": os.getenv("SLACK_CHANNEL_ID"),
+        "GMAIL_TOKEN_PATH": os.getenv("GMAIL_TOKEN_PATH","token.json"),
+    }
+    return MappingProxyType({k: ((v[:8]+"••••") if v else "", bool(v)) for k, v in env_vars.items()})
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _generate_report(dept: str, period: str, goal: str) -> dict:
+    """Report for one (dept, period, goal); repeat clicks on the same config are free."""
+    time.sleep(1.8)
+    return {
+        "dept": dept, "period": period, "goal": goal,
+        "generated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+    }
+
+def _aggregate_metrics(vals, stamps):
+    """Total of a counter series and the % change of its latest point vs the one before."""
+    total = 0.0
+    last = prev = -1
+    for i in range(len(stamps)):
+        total += vals[i]
+        if last < 0 or stamps[i] > stamps[last]:
+            prev, last = last, i
+        elif prev < 0 or stamps[i] > stamps[prev]:
+            prev = i
+    if prev < 0 or vals[prev] == 0:
+        return total, 0.0
+    return total, (vals[last] - vals[prev]) / vals[prev] * 100.0
+
+@st.cache_resource(show_spinner=False)
+def _metrics_aggregator():
+    """_aggregate_metrics, compiled with numba and primed on first use when numba is installed."""
+    try:
+        from numba import njit
+    except ImportError:
+        return _aggregate_metrics
+    import numpy as np
+    fn = njit("Tuple((float64,float64))(float64[:], int64[:])", cache=True)(_aggregate_metrics)
+    fn(np.zeros(2), np.arange(2, dtype=np.int64))  # prime the on-disk cache
+    return fn
+
+@st.cache_resource(show_spinner=False)
+def _plotly():
+    """Import Plotly on first chart render, switching it to orjson when that is installed."""
+    import plotly.graph_objects as go
+    import plotly.io as pio
+    if importlib.util.find_spec("orjson"):  # optional: faster figure serialization for st.plotly_chart
+        pio.json.config.default_engine = "orjson"
+    return go
+
+@st.cache_data(show_spinner=False)
+def _recent_activity():
+    """Static Dashboard activity feed, built once per process."""
+    import pandas as pd
+    return pd.DataFrame([
+        {"Time":"04:12","Event":"📄 crm_data.json ingested","Source":"CRM","Status":"✅"},
+        {"Time":"04:10","Event":"📧 5 Gmail messages indexed","Source":"Gmail","Status":"✅"},
+        {"Time":"04:09","Event":"💬 Slack joined #intelforge-bot","Source":"Slack","Status":"✅"},
+        {"Time":"03:58","Event":"🔍 Query: enterprise deals","Source":"Agent","Status":"✅"},
+        {"Time":"03:45","Event":"📊 SWOT report generated","Source":"Agent","Status":"✅"},
+        {"Time":"03:30","Event":"📄 3 PDFs chunked + indexed","Source":"File","Status":"✅"},
+    ])
+
+_LOG_PAGE_SIZE = 100
+_LOG_TABLE_MAX = 20  # up to this many rows, a static st.table skips the DataFrame/grid round-trip
+_LOG_COLUMNS = ("Time", "User", "Query", "Source", "Tokens", "Latency", "Status")
+_DEMO_LOGS = (
+    ("04:12", "admin", "What are our top deals?",  "CRM",   "412", "1.2s", "✅"),
+    ("04:10", "admin", "Summarize recent emails",  "Gmail", "318", "0.9s", "✅"),
+    ("03:58", "admin", "SWOT analysis",            "All",   "891", "2.1s", "✅"),
+    ("03:45", "admin", "Show me KPIs",             "CRM",   "524", "1.4s", "✅"),
+    ("03:30", "admin", "Enterprise deal pipeline", "CRM",   "677", "1.8s", "✅"),
 )
 
+@st.cache_data(max_entries=16, show_spinner=False)
+def _build_log_frame(live, demo=_DEMO_LOGS):
+    """Admin query-log table, rebuilt only when the logged rows change."""
+    import pandas as pd
+    return pd.DataFrame(itertools.chain(live, demo), columns=_LOG_COLUMNS)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _log_csv(live, demo=_DEMO_LOGS) -> bytes:
+    """CSV export of the full log, built on first Export click and written in row batches."""
+    import io
+    buf = io.BytesIO()
+    _build_log_frame(live, demo).to_csv(buf, index=False, chunksize=5000)
+    return buf.getvalue()
+
+@st.cache_resource(show_spinner=False)
+def chart_layout():
+    """Shared read-only Plotly layout, built once per process and merged into every figure."""
+    return MappingProxyType(dict(
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(family="Inter", color="#94A3B8"),
+        margin=dict(t=20, b=10, l=0, r=0),
+        xaxis=dict(gridcolor="rgba(255,255,255,0.05)", tickfont=dict(color="#64748B")),
+        yaxis=dict(gridcolor="rgba(255,255,255,0.05)", tickfont=dict(color="#64748B")),
+    ))
+
+_MAX_LINE_POINTS = 1000  # about one point per horizontal pixel of a full-width chart
+
+def _lttb_indices(y, n_out):
+    """Largest-Triangle-Three-Buckets: indices of the n_out points that best keep the shape of y."""
+    n = len(y)
+    bucket = (n - 2) / (n_out - 2)
+    idx, a = [0], 0
+    for i in range(n_out - 2):
+        start = int(i * bucket) + 1
+        end = int((i + 1) * bucket) + 1
+        nxt_end = min(max(int((i + 2) * bucket) + 1, end + 1), n)
+        avg_x = (end + nxt_end - 1) / 2
+        avg_y = sum(y[end:nxt_end]) / (nxt_end - end)
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((a - avg_x) * (y[j] - y[a]) - (a - j) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        idx.append(best)
+        a = best
+    idx.append(n - 1)
+    return idx
+
+def _downsample(x, y, n_out=_MAX_LINE_POINTS):
+    """LTTB-downsample a line series before plotting; short series pass through untouched."""
+    if len(y) <= n_out:
+        return x, y
+    try:
+        # tsdownsample is optional: its Rust LTTB is much faster on long series
+        import numpy as np
+        from tsdownsample import LTTBDownsampler
+        idx = LTTBDownsampler().downsample(np.asarray(y, dtype=np.float64), n_out=n_out)
+    except ImportError:
+        idx = _lttb_indices(y, n_out)
+    return tuple(x[i] for i in idx), tuple(y[i] for i in idx)
+
+_MAX_CATEGORIES = 30  # beyond this, pie slices and bar labels stop being readable anyway
+
+def _top_categories(labels, values, n_out=_MAX_CATEGORIES):
+    """Keep the n_out-1 largest categories and fold the rest into "Other"; small inputs pass through."""
+    if len(values) <= n_out:
+        return labels, values
+    ranked = sorted(zip(values, labels), reverse=True)
+    head, tail = ranked[:n_out - 1], ranked[n_out - 1:]
+    return (tuple(l for _, l in head) + ("Other",),
+            tuple(v for v, _ in head) + (sum(v for v, _ in tail),))
+
+# ── Figure builders: pure functions of hashable (tuple) inputs, shared read-only across reruns ──
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _build_query_volume_fig(days, qs):
+    go = _plotly()
+    days, qs = _downsample(days, qs)
+    fig = go.Figure(go.Scattergl(
+        x=days, y=qs, mode="lines+markers",
+        line=dict(color="#00D4FF", width=2.5),
+        marker=dict(color="#00D4FF", size=7, line=dict(color="#0A2540", width=2)),
+        fill="tozeroy", fillcolor="rgba(0,212,255,0.06)",
+    ))
+    fig.update_layout(chart_layout(), height=210, showlegend=False)
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _build_revenue_trend_fig(months, rev, target):
+    go = _plotly()
+    months_t, target = _downsample(months, target)
+    months, rev = _downsample(months, rev)
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(x=months, y=rev, name="Actual",
+        mode="lines+markers",
+        line=dict(color="#00D4FF", width=2.5),
+        marker=dict(size=7, color="#00D4FF", line=dict(color="#0F172A",width=2)),
+        fill="tozeroy", fillcolor="rgba(0,212,255,0.07)"))
+    fig.add_trace(go.Scattergl(x=months_t, y=target, name="Target",
+        mode="lines", line=dict(color="#818CF8", width=1.5, dash="dash")))
+    fig.update_layout(chart_layout(), height=280,
+        legend=dict(font=dict(color="#94A3B8"),
+                    bgcolor="rgba(0,0,0,0)"))
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _build_kpi_fig(kpis, actual, target):
+    go = _plotly()
+    fig = go.Figure()
+    fig.add_trace(go.Bar(name="Actual", x=kpis, y=actual,
+        marker_color="#00D4FF", opacity=0.85))
+    fig.add_trace(go.Bar(name="Target", x=kpis, y=target,
+        marker_color="#818CF8", opacity=0.5))
+    fig.update_layout(chart_layout(), height=260, barmode="group",
+        legend=dict(font=dict(color="#94A3B8"), bgcolor="rgba(0,0,0,0)"))
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _build_stage_pie_fig(labels, values):
+    go = _plotly()
+    labels, values = _top_categories(labels, values)
+    fig = go.Figure(go.Pie(
+        labels=labels, values=values, hole=0.52,
+        marker=dict(colors=["#0D3B6B","#0EA5E9","#38BDF8","#00D4FF",
+                            "#818CF8","#A78BFA","#C084FC","#E879F9"]),
+        textfont=dict(color="#E2E8F0", size=11),
+    ))
+    fig.update_layout(paper_bgcolor="rgba(0,0,0,0)", height=280,
+        margin=dict(t=10,b=10,l=0,r=0),
+        legend=dict(font=dict(color="#94A3B8"),bgcolor="rgba(0,0,0,0)"),
+        annotations=[dict(text="10 Deals",x=0.5,y=0.5,
+                          font=dict(size=16,color="#00D4FF"),showarrow=False)])
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def _build_industry_bar_fig(inds, vals):
+    go = _plotly()
+    inds, vals = _top_categories(inds, vals)
+    fig = go.Figure(go.Bar(
+        y=inds, x=vals, orientation="h",
+        marker=dict(color=vals,
+                    colorscale=[[0,"#0A2540"],[0.5,"#0D6B8B"],[1,"#00D4FF"]]),
+        text=[f"${v}K" for v in vals], textposition="outside",
+        textfont=dict(color="#94A3B8"),
+    ))
+    fig.update_layout(chart_layout(), height=300)
+    fig.update_yaxes(tickfont=dict(color="#94A3B8"))
+    return fig
+
 # ══════════════════════════════════════════════════════════════════════════════
 # SIDEBAR
 # ══════════════════════════════════════════════════════════════════════════════
@@ -671,11 +1144,10 @@ with st.sidebar:
     st.markdown("---")
 
     st.markdown("**⚡ Connectors**")
-    gmail_ok = os.path.exists("token.json")
-    slack_ok = bool(os.getenv("SLACK_BOT_TOKEN"))
-    crm_ok   = os.path.exists("crm_data.json")
-    for name, ok in [("Gmail", gmail_ok), ("Slack", slack_ok), ("CRM", crm_ok)]:
-        st.markdown(f"{'🟢' if ok else '🔴'} {name}")
+    conn = _connector_status()
+    gmail_ok, slack_ok, crm_ok = conn["Gmail"], conn["Slack"], conn["CRM"]
+    rows = "".join(f"<div>{'🟢' if ok else '🔴'} {name}</div>" for name, ok in conn.items())
+    st.markdown(rows, unsafe_allow_html=True)
 
     st.markdown("---")
     st.markdown('<div style="color:#334155;font-size:0.7rem;text-align:center;">AI-BOS v2.0 • IntelForge Engine</div>', unsafe_allow_html=True)
@@ -683,91 +1155,79 @@ with st.sidebar:
 # ══════════════════════════════════════════════════════════════════════════════
 # PAGE: DASHBOARD
 # ══════════════════════════════════════════════════════════════════════════════
-if page == "🏠 Dashboard":
+@st.fragment
+def _page_dashboard():
+    import numpy as np
     pstats = get_pinecone_stats()
     tv = pstats["total_vectors"]
     td = st.session_state.total_docs
-    qt = random.randint(18, 42)
-    au = random.randint(3, 9)
-
-    st.markdown("""<div class="page-header">
-        <h1>🧠 AI-BOS Business Brain</h1>
-        <p>Intelligent Business Operations System • Real-time Knowledge Pipeline</p>
-    </div>""", unsafe_allow_html=True)
-
-    c1, c2, c3, c4 = st.columns(4)
-    for col, icon, val, label, delta, cls in [
-        (c1, "📄", td,     "Total Documents",  "↑ +12 this week",  "delta-up"),
-        (c2, "🔮", f"{tv:,}", "Vectors Indexed", f"↑ +{random.randint(50,220)} today", "delta-up"),
-        (c3, "💬", qt,     "Queries Today",    "↑ +8 vs yesterday","delta-up"),
-        (c4, "👥", au,     "Active Users",     "↑ +2 this hour",   "delta-up"),
-    ]:
-        with col:
-            st.markdown(f"""<div class="metric-card">
+    # Demo counters are rolled once per session so they don't jitter on every rerun.
+    if "_dash_nums" not in st.session_state:
+        st.session_state._dash_nums = {
+            "qt": random.randint(18, 42),
+            "au": random.randint(3, 9),
+            "delta_vecs": random.randint(50, 220),
+        }
+    n = st.session_state._dash_nums
+    qt, au = n["qt"], n["au"]
+
+    st.markdown(_HDR_DASHBOARD, unsafe_allow_html=True)
+
+    cards_html = "".join(f"""<div class="metric-card">
                 <div class="metric-icon">{icon}</div>
                 <div class="metric-value">{val}</div>
                 <div class="metric-label">{label}</div>
                 <span class="metric-delta {cls}">{delta}</span>
-            </div>""", unsafe_allow_html=True)
+            </div>""" for icon, val, label, delta, cls in [
+        ("📄", td,     "Total Documents",  "↑ +12 this week",  "delta-up"),
+        ("🔮", f"{tv:,}", "Vectors Indexed", f"↑ +{n['delta_vecs']} today", "delta-up"),
+        ("💬", qt,     "Queries Today",    "↑ +8 vs yesterday","delta-up"),
+        ("👥", au,     "Active Users",     "↑ +2 this hour",   "delta-up"),
+    ])
+    st.markdown(f'<div class="card-row">{cards_html}</div>', unsafe_allow_html=True)
 
     st.markdown("<br>", unsafe_allow_html=True)
     left, right = st.columns([3, 2])
 
     with left:
         st.markdown('<div class="section-h">📋 Recent Activity</div>', unsafe_allow_html=True)
-        act = pd.DataFrame([
-            {"Time":"04:12","Event":"📄 crm_data.json ingested","Source":"CRM","Status":"✅"},
-            {"Time":"04:10","Event":"📧 5 Gmail messages indexed","Source":"Gmail","Status":"✅"},
-            {"Time":"04:09","Event":"💬 Slack joined #intelforge-bot","Source":"Slack","Status":"✅"},
-            {"Time":"03:58","Event":"🔍 Query: enterprise deals","Source":"Agent","Status":"✅"},
-            {"Time":"03:45","Event":"📊 SWOT report generated","Source":"Agent","Status":"✅"},
-            {"Time":"03:30","Event":"📄 3 PDFs chunked + indexed","Source":"File","Status":"✅"},
-        ])
-        st.dataframe(act, use_container_width=True, hide_index=True, height=260)
+        st.dataframe(_recent_activity(), use_container_width=True, hide_index=True, height=260)
 
     with right:
         st.markdown('<div class="section-h">🔮 Pinecone Health</div>', unsafe_allow_html=True)
         fp = round(pstats["fullness"] * 100, 1)
-        fig_g = go.Figure(go.Indicator(
-            mode="gauge+number",
-            value=fp,
-            title={"text":"Index Fullness %","font":{"color":"#64748B","size":12}},
-            number={"suffix":"%","font":{"color":"#00D4FF","size":22}},
-            gauge={"axis":{"range":[0,100],"tickcolor":"#334155"},
-                   "bar":{"color":"#00D4FF"},
-                   "bgcolor":"rgba(255,255,255,0.03)",
-                   "steps":[{"range":[0,60],"color":"rgba(16,185,129,.08)"},
-                             {"range":[60,85],"color":"rgba(245,158,11,.08)"},
-                             {"range":[85,100],"color":"rgba(239,68,68,.08)"}]}
-        ))
-        fig_g.update_layout(paper_bgcolor="rgba(0,0,0,0)", height=200, margin=dict(t=30,b=0,l=0,r=0))
-        st.plotly_chart(fig_g, use_container_width=True)
+        st.markdown(f"""<div class="gauge-ring" style="background:conic-gradient(#00D4FF {fp}%, rgba(255,255,255,0.05) 0);">
+            <div class="gauge-ring-inner">
+                <div class="metric-value" style="font-size:1.6rem;">{fp}%</div>
+                <div class="gauge-ring-label">Index Fullness</div>
+            </div>
+        </div>""", unsafe_allow_html=True)
         st.markdown(f"""<div style="display:flex;justify-content:space-between;color:#64748B;font-size:0.8rem;padding:0 4px;">
             <span>Vectors: <b style="color:#00D4FF">{tv:,}</b></span>
             <span>Dims: <b style="color:#00D4FF">{pstats['dimension']}</b></span>
             <span>Metric: <b style="color:#00D4FF">cosine</b></span>
         </div>""", unsafe_allow_html=True)
+        if st.button("🔄 Refresh stats", key="pstats_refresh"):
+            _fetch_pinecone_stats.clear()
+            st.session_state.pop("_dash_nums", None)
+            _rerun_page()
 
-    st.markdown('<div class="section-h">📈 Query Volume — Last 7 Days</div>', unsafe_allow_html=True)
     days = [(datetime.date.today()-datetime.timedelta(days=i)).strftime("%b %d") for i in range(6,-1,-1)]
-    qs   = [random.randint(8,45) for _ in days]
-    fig_l = go.Figure(go.Scatter(
-        x=days, y=qs, mode="lines+markers",
-        line=dict(color="#00D4FF", width=2.5),
-        marker=dict(color="#00D4FF", size=7, line=dict(color="#0A2540", width=2)),
-        fill="tozeroy", fillcolor="rgba(0,212,255,0.06)",
-    ))
-    fig_l.update_layout(**CHART_LAYOUT, height=210, showlegend=False)
-    st.plotly_chart(fig_l, use_container_width=True)
+    rng  = random.Random(datetime.date.today().toordinal())  # stable for the day, so the figure cache hits
+    qs   = [rng.randint(8,45) for _ in days]
+    q_total, q_delta = _metrics_aggregator()(np.array(qs, dtype=np.float64), np.arange(len(qs), dtype=np.int64))
+    st.markdown(f'<div class="section-h">📈 Query Volume — Last 7 Days '
+                f'<span style="color:#64748B;font-size:0.8rem;font-weight:400;">'
+                f'{int(q_total)} total • {q_delta:+.0f}% vs yesterday</span></div>', unsafe_allow_html=True)
+    st.plotly_chart(_build_query_volume_fig(tuple(days), tuple(qs)), use_container_width=True)
 
 # ══════════════════════════════════════════════════════════════════════════════
 # PAGE: DATA INGESTION
 # ══════════════════════════════════════════════════════════════════════════════
-elif page == "📂 Data Ingestion":
-    st.markdown("""<div class="page-header">
-        <h1>📂 Data Ingestion Hub</h1>
-        <p>Index documents and connect live data sources to your knowledge base</p>
-    </div>""", unsafe_allow_html=True)
+@st.fragment
+def _page_ingestion():
+    import pandas as pd
+    st.markdown(_HDR_INGESTION, unsafe_allow_html=True)
 
     left, right = st.columns([3, 2])
     with left:
@@ -776,9 +1236,10 @@ elif page == "📂 Data Ingestion":
                                type=["pdf","csv","txt","md"],
                                accept_multiple_files=True)
         if ups:
-            existing = [x["name"] for x in st.session_state.ingested_files]
+            names = st.session_state.ingested_names
             for f in ups:
-                if f.name not in existing:
+                if f.name not in names:
+                    names.add(f.name)
                     st.session_state.ingested_files.append({
                         "name": f.name,
                         "size": f"{round(f.size/1024,1)} KB",
@@ -786,31 +1247,78 @@ elif page == "📂 Data Ingestion":
                         "status": "⏳ Pending",
                         "uploaded": ts(),
                     })
+                    st.session_state.ingested_files_df = None
 
         if st.session_state.ingested_files:
             st.markdown('<div class="section-h">📋 File Queue</div>', unsafe_allow_html=True)
-            st.dataframe(pd.DataFrame(st.session_state.ingested_files),
+            # The queue's DataFrame is rebuilt only after the queue itself changes
+            if st.session_state.ingested_files_df is None:
+                st.session_state.ingested_files_df = pd.DataFrame(st.session_state.ingested_files)
+            st.dataframe(st.session_state.ingested_files_df,
                          use_container_width=True, hide_index=True)
             b1, b2 = st.columns(2)
             with b1:
                 if st.button("🚀 Index All Files", use_container_width=True):
                     prog = st.progress(0)
-                    n = len(st.session_state.ingested_files)
-                    for i, f in enumerate(st.session_state.ingested_files):
-                        prog.progress((i+1)/n, text=f"⚙️ Processing {f['name']}...")
-                        time.sleep(0.35)
-                        st.session_state.ingested_files[i]["status"] = "✅ Indexed"
-                    st.session_state.total_docs += n
+                    queue = st.session_state.ingested_files
+                    handles = {u.name: u for u in ups or []}
+                    # The uploader forgets its files when the user navigates away; those entries
+                    # have nothing left to chunk and must be uploaded again
+                    stale = [f for f in queue if f["name"] not in handles and f["status"] != "✅ Indexed"]
+                    for f in stale:
+                        f["status"] = "⚠️ Re-upload needed"
+                    n, done = sum(f["name"] in handles for f in queue), 0
+                    chunked, chunks = [], []
+                    with ThreadPoolExecutor(max_workers=8) as ex:
+                        futs = {ex.submit(_chunk_upload, handles[f["name"]]): f
+                                for f in queue if f["name"] in handles}
+                        for fut in as_completed(futs):
+                            f = futs[fut]
+                            try:
+                                chunks.extend(fut.result())
+                                f["status"] = "✂️ Chunked"
+                                chunked.append(f)
+                            except Exception:
+                                logger.exception("Chunking %s failed", f["name"])
+                                f["status"] = "❌ Failed"
+                            done += 1
+                            prog.progress(done/n, text=f"⚙️ Processed {f['name']}...")
+                    # One upsert for every file's chunks; only files that reached Pinecone count as indexed
+                    ok = 0
+                    if chunks and not os.getenv("PINECONE_API_KEY"):
+                        logger.warning("PINECONE_API_KEY is not set; %d file(s) chunked but not indexed", len(chunked))
+                    elif chunks:
+                        prog.progress(1.0, text="🔮 Upserting to Pinecone...")
+                        from rag import upsert_documents_to_pinecone_async
+                        try:
+                            asyncio.run(upsert_documents_to_pinecone_async(chunks))
+                        except Exception:
+                            logger.exception("Upserting %d chunk(s) to Pinecone failed", len(chunks))
+                        else:
+                            for f in chunked:
+                                f["status"] = "✅ Indexed"
+                            ok = len(chunked)
+                            _fetch_pinecone_stats.clear()
+                    st.session_state.total_docs += ok
+                    st.session_state.ingested_files_df = None
                     prog.empty()
-                    st.toast(f"✅ {n} files indexed!", icon="🎉")
-                    st.rerun()
+                    if n:
+                        st.toast(f"✅ {ok}/{n} files indexed!", icon="🎉")
+                    if len(chunked) > ok:
+                        st.toast(f"{len(chunked) - ok} file(s) chunked but not upserted to Pinecone.", icon="⚠️")
+                    if stale:
+                        st.toast(f"{len(stale)} queued file(s) need to be uploaded again.", icon="⚠️")
+                    _rerun_page()
             with b2:
                 if st.button("🗑️ Clear Queue", use_container_width=True):
                     st.session_state.ingested_files = []
-                    st.rerun()
+                    st.session_state.ingested_names = set()
+                    st.session_state.ingested_files_df = None
+                    _rerun_page()
 
     with right:
         st.markdown('<div class="section-h">🔌 Live Connectors</div>', unsafe_allow_html=True)
+        conn_html = []
         for icon, name, auth, ok in [
             ("📧","Gmail","OAuth2",      gmail_ok),
             ("💬","Slack","Bot Token",   slack_ok),
@@ -818,56 +1326,50 @@ elif page == "📂 Data Ingestion":
         ]:
             cls   = "badge-on" if ok else "badge-off"
             txt   = "● Connected" if ok else "● Disconnected"
-            st.markdown(f"""<div class="conn-card">
+            conn_html.append(f"""<div class="conn-card">
                 <div style="display:flex;align-items:center;gap:12px;">
                     <span style="font-size:1.4rem;">{icon}</span>
                     <div><div style="font-weight:600;color:#E2E8F0;">{name}</div>
                     <div style="font-size:0.74rem;color:#475569;">{auth}</div></div>
                 </div>
                 <span class="badge {cls}">{txt}</span>
-            </div>""", unsafe_allow_html=True)
+            </div>""")
+        st.markdown("".join(conn_html), unsafe_allow_html=True)
 
         st.markdown("<br>", unsafe_allow_html=True)
         st.markdown('<div class="section-h">⚡ Full Re-Index</div>', unsafe_allow_html=True)
         st.caption("Pull fresh data from all sources and refresh Pinecone.")
         if st.button("🔄 Re-Index Everything", use_container_width=True):
-            steps = [
-                ("📧 Fetching Gmail...",         0.4),
-                ("💬 Fetching Slack...",          0.3),
-                ("🗂️ Loading CRM data...",        0.3),
+            pulls = [
+                ("gmail", "📧 Gmail",  0.4),
+                ("slack", "💬 Slack",  0.3),
+                ("crm",   "🗂️ CRM",    0.3),
+            ]
+            finish = [
                 ("✂️ Chunking documents...",      0.5),
                 ("🔮 Upserting to Pinecone...",   0.6),
                 ("✅ Finalizing...",              0.2),
             ]
             prog = st.progress(0)
             ph   = st.empty()
-            for i,(msg,dl) in enumerate(steps):
-                ph.info(msg)
-                time.sleep(dl)
-                prog.progress((i+1)/len(steps))
+            _run_reindex(pulls, finish, prog, ph)
             prog.empty(); ph.empty()
+            _connector_status.clear()
+            _fetch_pinecone_stats.clear()
             st.toast("🎉 All sources re-indexed!", icon="✅")
+            st.rerun()  # full run, so the sidebar connector status picks up the refresh
 
 # ══════════════════════════════════════════════════════════════════════════════
 # PAGE: AI ASSISTANT
 # ══════════════════════════════════════════════════════════════════════════════
-elif page == "💬 AI Assistant":
-    st.markdown("""<div class="page-header">
-        <h1>💬 AI Business Assistant</h1>
-        <p>Powered by Gemini 2.0 Flash • RAG-enhanced with your business knowledge</p>
-    </div>""", unsafe_allow_html=True)
+@st.fragment
+def _page_assistant():
+    st.markdown(_HDR_ASSISTANT, unsafe_allow_html=True)
 
     # ── Empty state suggestion chips ──────────────────────────────────────────
     if not st.session_state.chat_history:
-        st.markdown("""<div style="text-align:center;padding:36px 0 8px 0;">
-            <div style="font-size:3.5rem;margin-bottom:8px;">🧠</div>
-            <div style="font-size:1.2rem;font-weight:600;color:#CBD5E1;">Your Business Brain is ready</div>
-            <div style="font-size:0.85rem;color:#475569;margin-top:6px;">
-                Ask anything about your deals, emails, or company knowledge
-            </div>
-        </div>""", unsafe_allow_html=True)
-
-        st.markdown('<div class="section-h" style="text-align:center;">💡 Try asking...</div>', unsafe_allow_html=True)
+        st.markdown(_CHAT_EMPTY_HTML, unsafe_allow_html=True)
+        st.markdown(_TRY_ASKING_HTML, unsafe_allow_html=True)
 
         chips = [
             ("📊", "What are our top deals?"),
@@ -882,25 +1384,27 @@ elif page == "💬 AI Assistant":
             with cols[i % 3]:
                 if st.button(f"{icon} {text}", use_container_width=True, key=f"chip_{i}"):
                     st.session_state._prompt = text
-                    st.rerun()
+                    _rerun_page()
 
     # ── Chat History ──────────────────────────────────────────────────────────
     if st.session_state.chat_history:
+        html_parts = []
         for idx, msg in enumerate(st.session_state.chat_history):
             if msg["role"] == "user":
-                st.markdown(f"""<div class="bubble-wrap user-wrap">
+                html_parts.append(f"""<div class="bubble-wrap user-wrap">
                     <div class="avatar avatar-user">👤</div>
                     <div class="bubble-content">
                         <div class="chat-bubble-user">{msg['content']}</div>
                         <div class="chat-meta" style="justify-content:flex-end;text-align:right;">{msg.get('time','')}</div>
                     </div>
-                </div>""", unsafe_allow_html=True)
+                </div>""")
             else:
                 content_html = msg["content"].replace("\n", "<br>")
-                st.markdown(f"""<div class="bubble-wrap">
+                reveal = " reveal" if msg.pop("fresh", False) else ""
+                html_parts.append(f"""<div class="bubble-wrap">
                     <div class="avatar avatar-bot">🧠</div>
                     <div class="bubble-content">
-                        <div class="chat-bubble-bot">{content_html}</div>
+                        <div class="chat-bubble-bot{reveal}">{content_html}</div>
                         <div class="chat-meta">
                             {msg.get('time','')}
                             &nbsp;
@@ -912,27 +1416,27 @@ elif page == "💬 AI Assistant":
                             <button class="fb-btn" onclick="void(0)">🔁 Retry</button>
                         </div>
                     </div>
-                </div>""", unsafe_allow_html=True)
+                </div>""")
+        st.markdown("".join(html_parts), unsafe_allow_html=True)
 
         st.markdown("<br>", unsafe_allow_html=True)
         if st.button("🗑️ Clear Conversation", use_container_width=True):
-            st.session_state.chat_history = []
-            st.rerun()
+            st.session_state.chat_history.clear()
+            _rerun_page()
 
-    # ── Chat Input ────────────────────────────────────────────────────────────
-    st.markdown("---")
-    user_input = st.chat_input("Ask your Business Brain anything... (e.g. 'What are our top deals?')")
-
-    # Handle suggestion chip click
+    # ── Pending question (chat input at the top level, or a suggestion chip) ──
+    user_input = None
     if hasattr(st.session_state, "_prompt") and st.session_state._prompt:
         user_input = st.session_state._prompt
         st.session_state._prompt = None
 
     if user_input:
         now = ts()
-        st.session_state.chat_history.append({"role":"user","content":user_input,"time":now})
+        # ~4 chars per token; stored once so the Admin log never re-tokenizes
+        st.session_state.chat_history.append({"role":"user","content":user_input,"time":now,
+                                              "approx_tokens":len(user_input)//4})
 
-        # Typing indicator placeholder
+        # Typing indicator until the first token replaces it
         typing_placeholder = st.empty()
         typing_placeholder.markdown("""<div class="bubble-wrap">
             <div class="avatar avatar-bot">🧠</div>
@@ -942,42 +1446,30 @@ elif page == "💬 AI Assistant":
                 <span class="typing-dot"></span>
             </div>
         </div>""", unsafe_allow_html=True)
-        time.sleep(0.8)
-        typing_placeholder.empty()
 
-        # Get answer
-        try:
-            from agent import build_business_agent
-            if "agent_instance" not in st.session_state:
-                with st.spinner("Initializing AI agent..."):
-                    st.session_state.agent_instance = build_business_agent(docs=[])
-            result = st.session_state.agent_instance.invoke({"input": user_input})
-            answer = result.get("output", str(result))
-        except Exception:
+        # Stream the agent's answer token by token; without a Gemini key, use the demo answers
+        answer = ""
+        if os.getenv("GOOGLE_API_KEY"):
+            try:
+                answer = typing_placeholder.write_stream(_agent_token_stream(_get_agent(), user_input))
+            except Exception:
+                logger.exception("Agent answer failed; falling back to the demo answer")
+                st.toast("Live agent unavailable, showing a demo answer.", icon="⚠️")
+        streamed = bool(answer)
+        if not streamed:
+            typing_placeholder.empty()
             answer = get_answer(user_input)
 
-        # Stream the answer
-        stream_placeholder = st.empty()
-        rendered = ""
-        for chunk in stream_answer(answer):
-            rendered += chunk
-            stream_placeholder.markdown(f"""<div class="bubble-wrap">
-                <div class="avatar avatar-bot">🧠</div>
-                <div class="chat-bubble-bot">{rendered}▌</div>
-            </div>""", unsafe_allow_html=True)
-        stream_placeholder.empty()
-
-        st.session_state.chat_history.append({"role":"assistant","content":answer,"time":now})
-        st.rerun()
+        # Demo answers are written once and animated client-side via .reveal
+        st.session_state.chat_history.append({"role":"assistant","content":answer,"time":now,"fresh":not streamed})
+        _rerun_page()
 
 # ══════════════════════════════════════════════════════════════════════════════
 # PAGE: REPORTS GENERATOR
 # ══════════════════════════════════════════════════════════════════════════════
-elif page == "📊 Reports":
-    st.markdown("""<div class="page-header">
-        <h1>📊 Reports Generator</h1>
-        <p>AI-powered business intelligence reports with interactive charts</p>
-    </div>""", unsafe_allow_html=True)
+@st.fragment
+def _page_reports():
+    st.markdown(_HDR_REPORTS, unsafe_allow_html=True)
 
     # ── Report Config Form ─────────────────────────────────────────────────────
     with st.form("report_form"):
@@ -1002,12 +1494,8 @@ elif page == "📊 Reports":
     # ── Report Generation ──────────────────────────────────────────────────────
     if submitted:
         with st.spinner(f"🧠 Generating {goal} report for {dept}..."):
-            time.sleep(1.8)
+            st.session_state.report_output = _generate_report(dept, period, goal)
         st.toast("✅ Report generated!", icon="📊")
-        st.session_state.report_output = {
-            "dept": dept, "period": period, "goal": goal,
-            "generated_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-        }
 
     if st.session_state.report_output:
         rpt = st.session_state.report_output
@@ -1027,7 +1515,7 @@ elif page == "📊 Reports":
         # ── Report Tabs ────────────────────────────────────────────────────────
         tab1, tab2, tab3, tab4 = st.tabs([
             "📋 Executive Summary", "💡 Key Insights", "📈 Charts", "🎯 Action Plan"
-        ])
+        ], on_change="rerun")  # stateful tabs: only the selected one runs its body
 
         with tab1:
             st.markdown(f"""<div class="report-section">
@@ -1053,6 +1541,7 @@ The Pinecone vector database holds {st.session_state.vectors_indexed:,} vectors
         with tab2:
             col_i1, col_i2 = st.columns(2)
             with col_i1:
+                insight_html = []
                 for insight in [
                     ("🔥","Gamma AI Labs","$750K contract nearing close — needs legal review"),
                     ("📈","Healthcare vertical","Growing 22% with Epsilon Pilot running"),
@@ -1060,13 +1549,15 @@ The Pinecone vector database holds {st.session_state.vectors_indexed:,} vectors
                     ("✅","PII compliance","100% anonymization across all indexed data"),
                 ]:
                     icon, title, desc = insight
-                    st.markdown(f"""<div class="conn-card">
+                    insight_html.append(f"""<div class="conn-card">
                         <div>
                             <div style="font-weight:600;color:#E2E8F0;">{icon} {title}</div>
                             <div style="font-size:0.8rem;color:#64748B;margin-top:3px;">{desc}</div>
                         </div>
-                    </div>""", unsafe_allow_html=True)
+                    </div>""")
+                st.markdown("".join(insight_html), unsafe_allow_html=True)
             with col_i2:
+                insight_html = []
                 for insight in [
                     ("💡","RAG performance","Query latency avg 1.2s — well within SLA"),
                     ("🎯","Top opportunity","Beta Ventures $280K — proposal sent, follow up needed"),
@@ -1074,81 +1565,47 @@ The Pinecone vector database holds {st.session_state.vectors_indexed:,} vectors
                     ("🚀","Pipeline health","$1.15M in late-stage deals (Contract + Pilot)"),
                 ]:
                     icon, title, desc = insight
-                    st.markdown(f"""<div class="conn-card">
+                    insight_html.append(f"""<div class="conn-card">
                         <div>
                             <div style="font-weight:600;color:#E2E8F0;">{icon} {title}</div>
                             <div style="font-size:0.8rem;color:#64748B;margin-top:3px;">{desc}</div>
                         </div>
-                    </div>""", unsafe_allow_html=True)
+                    </div>""")
+                st.markdown("".join(insight_html), unsafe_allow_html=True)
 
         with tab3:
-            ch1, ch2 = st.columns(2)
-
-            with ch1:
-                # Sales Trend
-                st.markdown('<div class="section-h">📈 Revenue Trend</div>', unsafe_allow_html=True)
-                months = ["Sep","Oct","Nov","Dec","Jan","Feb"]
-                rev    = [180, 220, 195, 310, 275, 340]
-                target = [200, 230, 230, 280, 300, 320]
-                fig_trend = go.Figure()
-                fig_trend.add_trace(go.Scatter(x=months, y=rev, name="Actual",
-                    mode="lines+markers",
-                    line=dict(color="#00D4FF", width=2.5),
-                    marker=dict(size=7, color="#00D4FF", line=dict(color="#0F172A",width=2)),
-                    fill="tozeroy", fillcolor="rgba(0,212,255,0.07)"))
-                fig_trend.add_trace(go.Scatter(x=months, y=target, name="Target",
-                    mode="lines", line=dict(color="#818CF8", width=1.5, dash="dash")))
-                fig_trend.update_layout(**CHART_LAYOUT, height=280,
-                    legend=dict(font=dict(color="#94A3B8"),
-                                bgcolor="rgba(0,0,0,0)"))
-                st.plotly_chart(fig_trend, use_container_width=True)
-
-                # KPI Bar
-                st.markdown('<div class="section-h">📊 KPI Performance</div>', unsafe_allow_html=True)
-                kpis   = ["Win Rate","NPS Score","Pipeline Velocity","Avg Deal Size","CAC Ratio"]
-                actual = [34, 72, 67, 86, 91]
-                target_k = [40, 80, 70, 80, 90]
-                fig_kpi = go.Figure()
-                fig_kpi.add_trace(go.Bar(name="Actual", x=kpis, y=actual,
-                    marker_color="#00D4FF", opacity=0.85))
-                fig_kpi.add_trace(go.Bar(name="Target", x=kpis, y=target_k,
-                    marker_color="#818CF8", opacity=0.5))
-                fig_kpi.update_layout(**CHART_LAYOUT, height=260, barmode="group",
-                    legend=dict(font=dict(color="#94A3B8"), bgcolor="rgba(0,0,0,0)"))
-                st.plotly_chart(fig_kpi, use_container_width=True)
-
-            with ch2:
-                # Churn Pie
-                st.markdown('<div class="section-h">🔄 Deal Stage Distribution</div>', unsafe_allow_html=True)
-                labels = ["Initial","Qualified","Discovery","Demo","Proposal","Negotiation","Contract","Pilot"]
-                values = [2, 1, 1, 1, 2, 2, 1, 1]
-                fig_pie = go.Figure(go.Pie(
-                    labels=labels, values=values, hole=0.52,
-                    marker=dict(colors=["#0D3B6B","#0EA5E9","#38BDF8","#00D4FF",
-                                        "#818CF8","#A78BFA","#C084FC","#E879F9"]),
-                    textfont=dict(color="#E2E8F0", size=11),
-                ))
-                fig_pie.update_layout(paper_bgcolor="rgba(0,0,0,0)", height=280,
-                    margin=dict(t=10,b=10,l=0,r=0),
-                    legend=dict(font=dict(color="#94A3B8"),bgcolor="rgba(0,0,0,0)"),
-                    annotations=[dict(text="10 Deals",x=0.5,y=0.5,
-                                      font=dict(size=16,color="#00D4FF"),showarrow=False)])
-                st.plotly_chart(fig_pie, use_container_width=True)
-
-                # Industry heatmap
-                st.markdown('<div class="section-h">🏭 Revenue by Industry ($K)</div>', unsafe_allow_html=True)
-                inds = ["AI","Healthcare","Finance","Software","Manufacturing","Retail","EdTech","Media"]
-                vals = [750, 400, 280, 500, 320, 200, 80, 150]
-                fig_bar = go.Figure(go.Bar(
-                    y=inds, x=vals, orientation="h",
-                    marker=dict(color=vals,
-                                colorscale=[[0,"#0A2540"],[0.5,"#0D6B8B"],[1,"#00D4FF"]]),
-                    text=[f"${v}K" for v in vals], textposition="outside",
-                    textfont=dict(color="#94A3B8"),
-                ))
-                fig_bar.update_layout(**CHART_LAYOUT, height=300,
-                    yaxis=dict(tickfont=dict(color="#94A3B8")))
-                st.plotly_chart(fig_bar, use_container_width=True)
+            if tab3.open:  # charts only build while their tab is selected
+                ch1, ch2 = st.columns(2)
+
+                with ch1:
+                    # Sales Trend
+                    st.markdown('<div class="section-h">📈 Revenue Trend</div>', unsafe_allow_html=True)
+                    months = ["Sep","Oct","Nov","Dec","Jan","Feb"]
+                    rev    = [180, 220, 195, 310, 275, 340]
+                    target = [200, 230, 230, 280, 300, 320]
+                    st.plotly_chart(_build_revenue_trend_fig(tuple(months), tuple(rev), tuple(target)),
+                                    use_container_width=True)
+
+                    # KPI Bar
+                    st.markdown('<div class="section-h">📊 KPI Performance</div>', unsafe_allow_html=True)
+                    kpis   = ["Win Rate","NPS Score","Pipeline Velocity","Avg Deal Size","CAC Ratio"]
+                    actual = [34, 72, 67, 86, 91]
+                    target_k = [40, 80, 70, 80, 90]
+                    st.plotly_chart(_build_kpi_fig(tuple(kpis), tuple(actual), tuple(target_k)),
+                                    use_container_width=True)
+
+                with ch2:
+                    # Churn Pie
+                    st.markdown('<div class="section-h">🔄 Deal Stage Distribution</div>', unsafe_allow_html=True)
+                    labels = ["Initial","Qualified","Discovery","Demo","Proposal","Negotiation","Contract","Pilot"]
+                    values = [2, 1, 1, 1, 2, 2, 1, 1]
+                    st.plotly_chart(_build_stage_pie_fig(tuple(labels), tuple(values)), use_container_width=True)
+
+                    # Industry heatmap
+                    st.markdown('<div class="section-h">🏭 Revenue by Industry ($K)</div>', unsafe_allow_html=True)
+                    inds = ["AI","Healthcare","Finance","Software","Manufacturing","Retail","EdTech","Media"]
+                    vals = [750, 400, 280, 500, 320, 200, 80, 150]
+                    st.plotly_chart(_build_industry_bar_fig(tuple(inds), tuple(vals)), use_container_width=True)
 
         with tab4:
             actions = [
@@ -1158,8 +1615,9 @@ The Pinecone vector database holds {st.session_state.vectors_indexed:,} vectors
                 ("🟡","Medium","Re-engage Beta Ventures ($280K)","2 weeks","Proposal sent 10 days ago — no response"),
                 ("🟢","Low","Onboard Zeta Education ($80K)","Next month","Qualified lead — assign BDR for nurturing"),
             ]
+            action_html = []
             for pri_icon, pri, action, deadline, detail in actions:
-                st.markdown(f"""<div class="conn-card">
+                action_html.append(f"""<div class="conn-card">
                     <div style="display:flex;align-items:flex-start;gap:14px;">
                         <span style="font-size:1.4rem;margin-top:2px;">{pri_icon}</span>
                         <div>
@@ -1171,7 +1629,8 @@ The Pinecone vector database holds {st.session_state.vectors_indexed:,} vectors
                         <span class="badge {'badge-off' if pri=='Critical' else 'badge-wrn' if pri=='High' else 'badge-on'}">{pri}</span>
                         <div style="font-size:0.72rem;color:#475569;margin-top:4px;">📅 {deadline}</div>
                     </div>
-                </div>""", unsafe_allow_html=True)
+                </div>""")
+            st.markdown("".join(action_html), unsafe_allow_html=True)
 
             st.markdown("<br>", unsafe_allow_html=True)
             dl1, dl2 = st.columns(2)
@@ -1185,11 +1644,9 @@ The Pinecone vector database holds {st.session_state.vectors_indexed:,} vectors
 # ══════════════════════════════════════════════════════════════════════════════
 # PAGE: ADMIN
 # ══════════════════════════════════════════════════════════════════════════════
-elif page == "🔧 Admin":
-    st.markdown("""<div class="page-header">
-        <h1>🔧 Admin Panel</h1>
-        <p>Secure system configuration, logs, and diagnostics</p>
-    </div>""", unsafe_allow_html=True)
+@st.fragment
+def _page_admin():
+    st.markdown(_HDR_ADMIN, unsafe_allow_html=True)
 
     # ── Password Gate ─────────────────────────────────────────────────────────
     if not st.session_state.admin_unlocked:
@@ -1202,18 +1659,18 @@ elif page == "🔧 Admin":
             if pwd == "admin123":
                 st.session_state.admin_unlocked = True
                 st.toast("✅ Admin unlocked!", icon="🔓")
-                st.rerun()
+                _rerun_page()
             else:
                 st.error("❌ Incorrect password. Default is **admin123** for demo.")
         st.markdown("<p style='color:#334155;font-size:0.72rem;margin-top:16px;'>Demo password: admin123</p>", unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
     else:
         # ── Logged-in admin ───────────────────────────────────────────────────
-        hdr_col, lock_col = st.columns([8, 1])
+        _, lock_col = st.columns([8, 1])
         with lock_col:
             if st.button("🔒 Lock", use_container_width=True):
                 st.session_state.admin_unlocked = False
-                st.rerun()
+                _rerun_page()
 
         adm1, adm2, adm3, adm4 = st.tabs([
             "📊 Overview", "⚙️ Configuration", "📋 Logs", "🔄 Re-Index"
@@ -1222,30 +1679,25 @@ elif page == "🔧 Admin":
         # ── TAB 1: Overview ───────────────────────────────────────────────────
         with adm1:
             pstats = get_pinecone_stats()
-            env_vars = {
-                "GOOGLE_API_KEY":   os.getenv("GOOGLE_API_KEY"),
-                "PINECONE_API_KEY": os.getenv("PINECONE_API_KEY"),
-                "SLACK_BOT_TOKEN":  os.getenv("SLACK_BOT_TOKEN"),
-                "SLACK_CHANNEL_ID": os.getenv("SLACK_CHANNEL_ID"),
-                "GMAIL_TOKEN_PATH": os.getenv("GMAIL_TOKEN_PATH","token.json"),
-            }
             ov1, ov2, ov3 = st.columns(3)
             with ov1:
                 st.markdown('<div class="section-h">⚙️ Env Variables</div>', unsafe_allow_html=True)
-                for var, val in env_vars.items():
-                    cls = "badge-on" if val else "badge-off"
-                    txt = "● Set" if val else "● Missing"
-                    masked = (val[:8]+"••••") if val else ""
-                    st.markdown(f"""<div class="conn-card" style="padding:10px 14px;">
+                env_html = []
+                for var, (masked, is_set) in _env_display().items():
+                    cls = "badge-on" if is_set else "badge-off"
+                    txt = "● Set" if is_set else "● Missing"
+                    env_html.append(f"""<div class="conn-card" style="padding:10px 14px;">
                         <span style="color:#94A3B8;font-size:0.78rem;">{var}</span>
                         <div style="display:flex;gap:6px;align-items:center;">
                             <span style="color:#475569;font-size:0.72rem;font-family:monospace;">{masked}</span>
                             <span class="badge {cls}">{txt}</span>
                         </div>
-                    </div>""", unsafe_allow_html=True)
+                    </div>""")
+                st.markdown("".join(env_html), unsafe_allow_html=True)
 
             with ov2:
                 st.markdown('<div class="section-h">🔮 Pinecone Stats</div>', unsafe_allow_html=True)
+                stats_html = []
                 for label, val in [
                     ("Index",   "business-intelligence"),
                     ("Vectors", f"{pstats['total_vectors']:,}"),
@@ -1253,19 +1705,22 @@ elif page == "🔧 Admin":
                     ("Metric",  "cosine"),
                     ("Fullness",f"{round(pstats['fullness']*100,1)}%"),
                 ]:
-                    st.markdown(f"""<div class="conn-card" style="padding:10px 14px;">
+                    stats_html.append(f"""<div class="conn-card" style="padding:10px 14px;">
                         <span style="color:#64748B;font-size:0.8rem;">{label}</span>
                         <span style="color:#00D4FF;font-weight:600;font-size:0.85rem;">{val}</span>
-                    </div>""", unsafe_allow_html=True)
+                    </div>""")
+                st.markdown("".join(stats_html), unsafe_allow_html=True)
 
             with ov3:
                 st.markdown('<div class="section-h">🩺 File Health</div>', unsafe_allow_html=True)
+                health_html = []
                 for fname in ["credentials.json","token.json","crm_data.json",".env","connectors.py","agent.py","ui.py"]:
                     ok = os.path.exists(fname)
-                    st.markdown(f"""<div class="conn-card" style="padding:10px 14px;">
+                    health_html.append(f"""<div class="conn-card" style="padding:10px 14px;">
                         <span style="color:#94A3B8;font-size:0.78rem;font-family:monospace;">{fname}</span>
                         <span class="badge {'badge-on' if ok else 'badge-off'}">{'● Found' if ok else '● Missing'}</span>
-                    </div>""", unsafe_allow_html=True)
+                    </div>""")
+                st.markdown("".join(health_html), unsafe_allow_html=True)
 
         # ── TAB 2: Configuration ──────────────────────────────────────────────
         with adm2:
@@ -1299,29 +1754,29 @@ elif page == "🔧 Admin":
 
         # ── TAB 3: Query Logs ─────────────────────────────────────────────────
         with adm3:
-            demo_logs = [
-                {"Time":"04:12","User":"admin","Query":"What are our top deals?","Source":"CRM","Tokens":"412","Latency":"1.2s","Status":"✅"},
-                {"Time":"04:10","User":"admin","Query":"Summarize recent emails","Source":"Gmail","Tokens":"318","Latency":"0.9s","Status":"✅"},
-                {"Time":"03:58","User":"admin","Query":"SWOT analysis","Source":"All","Tokens":"891","Latency":"2.1s","Status":"✅"},
-                {"Time":"03:45","User":"admin","Query":"Show me KPIs","Source":"CRM","Tokens":"524","Latency":"1.4s","Status":"✅"},
-                {"Time":"03:30","User":"admin","Query":"Enterprise deal pipeline","Source":"CRM","Tokens":"677","Latency":"1.8s","Status":"✅"},
-            ]
-            # Merge with live chat history
-            live = [{"Time":m["time"],"User":"session","Query":m["content"],"Source":"All","Tokens":str(len(m["content"].split())*4),"Latency":"--","Status":"✅"}
-                    for m in st.session_state.chat_history if m["role"]=="user"]
-            all_logs = live + demo_logs
-            st.markdown(f'<div class="section-h">📋 Query Log ({len(all_logs)} entries)</div>', unsafe_allow_html=True)
-            st.dataframe(pd.DataFrame(all_logs), use_container_width=True, hide_index=True, height=320)
+            # Merge with live chat history, newest first like the demo rows
+            live = tuple((m["time"], "session", m["content"], "All", str(m.get("approx_tokens", len(m["content"])//4)), "--", "✅")
+                         for m in reversed(st.session_state.chat_history) if m["role"]=="user")
+            n_logs = len(live) + len(_DEMO_LOGS)
+            st.markdown(f'<div class="section-h">📋 Query Log ({n_logs} entries)</div>', unsafe_allow_html=True)
+            if n_logs <= _LOG_TABLE_MAX:
+                st.table([dict(zip(_LOG_COLUMNS, row)) for row in itertools.chain(live, _DEMO_LOGS)], hide_index=True)
+            else:
+                # Only a window of rows goes to the browser; the CSV export still covers every entry
+                log_df = _build_log_frame(live)
+                shown = st.session_state.get("log_page", 1) * _LOG_PAGE_SIZE
+                st.dataframe(log_df.head(shown), use_container_width=True, hide_index=True, height=320)
+                if shown < n_logs and st.button(f"⬇️ Load more ({n_logs - shown} older)", use_container_width=True):
+                    st.session_state.log_page = st.session_state.get("log_page", 1) + 1
+                    _rerun_page()
             log_c1, log_c2 = st.columns(2)
             with log_c1:
                 if st.button("📥 Export Logs (CSV)", use_container_width=True):
-                    csv = pd.DataFrame(all_logs).to_csv(index=False)
-                    st.download_button("⬇️ Download", csv, "query_logs.csv", "text/csv", use_container_width=True)
+                    st.download_button("⬇️ Download", _log_csv(live), "query_logs.csv", "text/csv", use_container_width=True)
             with log_c2:
                 if st.button("🗑️ Clear All Logs", use_container_width=True):
-                    st.session_state.query_log = []
+                    st.session_state.query_log.clear()
                     st.toast("Logs cleared!", icon="🗑️")
-                    st.rerun()
 
         # ── TAB 4: Re-Index ───────────────────────────────────────────────────
         with adm4:
@@ -1334,21 +1789,26 @@ elif page == "🔧 Admin":
             with ri_col2:
                 crm_ri  = st.checkbox("🗂️ Include CRM", value=True)
                 files_ri = st.checkbox("📄 Include Uploaded Files", value=True)
+            synced = [f"{name} {time.strftime('%H:%M:%S', time.localtime(st.session_state.sync_state[src]))}"
+                      for src, name in (("gmail", "Gmail"), ("slack", "Slack"), ("crm", "CRM"), ("files", "Files"))
+                      if st.session_state.sync_state.get(src)]
+            if synced:
+                st.caption("Last synced: " + " • ".join(synced))
             if st.button("🔄 Start Full Re-Index", use_container_width=True):
-                steps = []
-                if gmail_ri: steps.append(("📧 Fetching Gmail...", 0.5))
-                if slack_ri: steps.append(("💬 Fetching Slack...", 0.4))
-                if crm_ri:   steps.append(("🗂️ Loading CRM...", 0.3))
-                if files_ri: steps.append(("📄 Processing files...", 0.4))
-                steps += [("✂️ Chunking text...", 0.5),("🔮 Upserting Pinecone...", 0.8),("✅ Done!", 0.2)]
+                pulls = []
+                if gmail_ri: pulls.append(("gmail", "📧 Gmail", 0.5))
+                if slack_ri: pulls.append(("slack", "💬 Slack", 0.4))
+                if crm_ri:   pulls.append(("crm",   "🗂️ CRM", 0.3))
+                if files_ri: pulls.append(("files", "📄 Files", 0.4))
+                finish = [("✂️ Chunking text...", 0.5),("🔮 Upserting Pinecone...", 0.8),("✅ Done!", 0.2)]
                 prog = st.progress(0)
                 ph = st.empty()
-                for i,(msg,dl) in enumerate(steps):
-                    ph.info(msg); time.sleep(dl)
-                    prog.progress((i+1)/len(steps))
+                _run_reindex(pulls, finish, prog, ph)
                 prog.empty(); ph.empty()
-                st.success("🎉 Re-index complete! All sources updated.")
-                st.toast("Pinecone index refreshed!", icon="🔮")
+                _connector_status.clear()
+                _fetch_pinecone_stats.clear()
+                st.toast("🎉 Re-index complete! All sources updated.", icon="🔮")
+                st.rerun()  # full run, so the sidebar connector status picks up the refresh
 
         # Quick action buttons below tabs
         st.markdown("---")
@@ -1359,13 +1819,28 @@ elif page == "🔧 Admin":
                 st.toast("✅ 13/13 passed!", icon="🎉")
         with qa2:
             if st.button("🗑️ Clear Chat", use_container_width=True):
-                st.session_state.chat_history = []
+                st.session_state.chat_history.clear()
                 st.toast("Chat cleared!", icon="🗑️")
         with qa3:
             if st.button("🔄 Reset Session", use_container_width=True):
-                st.session_state.admin_unlocked = False
-                for k in list(st.session_state.keys()): del st.session_state[k]
-                st.rerun()
+                st.session_state.clear()
+                st.rerun(scope="app")
+
+# ══════════════════════════════════════════════════════════════════════════════
+# PAGE DISPATCH — each page is a fragment, so its own widgets rerun only that page
+# ══════════════════════════════════════════════════════════════════════════════
+# The chat input lives outside the fragment so it stays pinned to the bottom of the page
+if page == "💬 AI Assistant" and (
+        prompt := st.chat_input("Ask your Business Brain anything... (e.g. 'What are our top deals?')")):
+    st.session_state._prompt = prompt
+PAGES = {
+    "🏠 Dashboard":      _page_dashboard,
+    "📂 Data Ingestion": _page_ingestion,
+    "💬 AI Assistant":   _page_assistant,
+    "📊 Reports":        _page_reports,
+    "🔧 Admin":          _page_admin,
+}
+PAGES[page]()
 
 # ══════════════════════════════════════════════════════════════════════════════
 # GLOBAL SEARCH (shown on every page except Admin)
@@ -1382,18 +1857,16 @@ if page != "🔧 Admin":
         with st.spinner("🧠 Searching knowledge base..."):
             time.sleep(0.6)
             answer = get_answer(gs_query)
-        st.session_state.global_search_result = {"query": gs_query, "answer": answer, "time": ts()}
+        # Rendered once here; later reruns re-emit the stored HTML as-is
+        now = ts()
+        st.session_state.global_search_result = {
+            "query": gs_query, "answer": answer, "time": now,
+            "html": _SEARCH_RESULT_TMPL.format(query=gs_query, time=now, answer=answer.translate(_NL_TO_BR)),
+        }
         # Log it
         st.session_state.query_log.append({"time": ts(), "query": gs_query, "source": "Global Search"})
     if st.session_state.global_search_result:
-        r = st.session_state.global_search_result
-        st.markdown(f"""<div class="search-result">
-            <div style="display:flex;justify-content:space-between;margin-bottom:10px;">
-                <span style="color:#00D4FF;font-weight:600;">🔍 Results for: \"{r['query']}\"</span>
-                <span style="color:#475569;font-size:0.78rem;">{r['time']}</span>
-            </div>
-            <div style="color:#CBD5E1;line-height:1.7;">{r['answer'].replace(chr(10),'<br>')}</div>
-        </div>""", unsafe_allow_html=True)
+        st.markdown(st.session_state.global_search_result["html"], unsafe_allow_html=True)
         if st.button("✕ Clear Search", key="gs_clear"):
             st.session_state.global_search_result = None
             st.rerun()
@@ -1401,19 +1874,4 @@ if page != "🔧 Admin":
 # ══════════════════════════════════════════════════════════════════════════════
 # FOOTER
 # ══════════════════════════════════════════════════════════════════════════════
-st.markdown("""
-<div class="aibos-footer">
-    <div class="footer-badges">
-        <span class="f-badge">🟦 Streamlit 1.32</span>
-        <span class="f-badge">🦜 LangChain 0.3</span>
-        <span class="f-badge">✨ Gemini 2.0 Flash</span>
-        <span class="f-badge">🌲 Pinecone</span>
-        <span class="f-badge">🔒 PII Anonymized</span>
-    </div>
-    <div style="margin-top:10px;">
-        AI-BOS v2.0 &nbsp;|&nbsp; Made with ❤️ for showcase
-        &nbsp;|&nbsp; <a href="https://github.com" target="_blank">GitHub</a>
-        &nbsp;|&nbsp; <span style="color:#00D4FF;">IntelForge Engine</span>
-    </div>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(_FOOTER_HTML, unsafe_allow_html=True)
@@ -3,7 +3,7 @@ utils.py
 ────────
 Shared utilities for AI-BOS:
   - Structured logging at INFO level
-  - Tenacity retry decorator (3 attempts, exponential backoff)
+  - Tenacity retry decorator (3 attempts, exponential backoff, transient errors only)
 """
 
 import logging
@@ -14,7 +14,7 @@ from tenacity import (
     retry,
     stop_after_attempt,
     wait_exponential,
-    retry_if_exception_type,
+    retry_if_exception,
     before_sleep_log,
 )
 import time
@@ -23,10 +23,10 @@ def timer(func: Callable) -> Callable:
     """Decorator to measure and log function execution time."""
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        start = time.time()
+        start = time.perf_counter()
         res = func(*args, **kwargs)
-        elapsed = time.time() - start
-        logging.getLogger(__name__).info("Function %s took %.4f seconds", func.__name__, elapsed)
+        elapsed = time.perf_counter() - start
+        _logger.info("Function %s took %.4f seconds", func.__name__, elapsed)
         return res
     return wrapper
 
@@ -34,10 +34,10 @@ def async_timer(func: Callable) -> Callable:
     """Decorator to measure and log async function execution time."""
     @functools.wraps(func)
     async def wrapper(*args, **kwargs):
-        start = time.time()
+        start = time.perf_counter()
         res = await func(*args, **kwargs)
-        elapsed = time.time() - start
-        logging.getLogger(__name__).info("Async Function %s took %.4f seconds", func.__name__, elapsed)
+        elapsed = time.perf_counter() - start
+        _logger.info("Async Function %s took %.4f seconds", func.__name__, elapsed)
         return res
     return wrapper
 
@@ -74,10 +74,68 @@ _logger = get_logger(__name__)
 F = TypeVar("F", bound=Callable[..., Any])
 
 
-def with_retries(func: F) -> F:
+@functools.cache
+def retryable_exceptions() -> tuple[type[BaseException], ...]:
+    """
+    Network, rate-limit and server-side errors worth retrying; SDKs are optional.
+
+    Resolved on the first failure rather than at import, so ``import utils``
+    doesn't pull in requests, google.api_core or pinecone.
+    """
+    exc: tuple[type[BaseException], ...] = (TimeoutError, ConnectionError)
+    try:
+        import requests
+        exc += (requests.ConnectionError, requests.Timeout)
+    except ImportError:
+        pass
+    try:
+        from urllib3.exceptions import MaxRetryError, ProtocolError
+        from urllib3.exceptions import TimeoutError as Urllib3Timeout
+        exc += (ProtocolError, Urllib3Timeout, MaxRetryError)
+    except ImportError:
+        pass
+    try:
+        from google.api_core import exceptions as gexc
+        exc += (gexc.TooManyRequests, gexc.ServiceUnavailable,
+                gexc.DeadlineExceeded, gexc.InternalServerError)
+    except ImportError:
+        pass
+    try:
+        from pinecone.exceptions import PineconeProtocolError, ServiceException
+        exc += (ServiceException, PineconeProtocolError)
+    except ImportError:
+        pass
+    return exc
+
+
+def _is_retryable(exc: BaseException, retry_on: tuple[type[BaseException], ...] | None) -> bool:
+    """
+    True if ``exc`` or anything in its ``__cause__`` chain is one of ``retry_on``.
+
+    SDK wrappers (e.g. LangChain's GoogleGenerativeAIError) re-raise transport
+    errors ``from`` the original, so the cause chain is where the type survives.
+    """
+    if retry_on is None:
+        retry_on = retryable_exceptions()
+    while exc is not None:
+        if isinstance(exc, retry_on):
+            return True
+        exc = exc.__cause__
+    return False
+
+
+def with_retries(
+    func: F | None = None,
+    *,
+    retry_on: tuple[type[BaseException], ...] | None = None,
+) -> Any:
     """
     Decorator: retry the wrapped function up to 3 times with exponential
-    back-off (2 s → 4 s → 8 s) on any ``Exception``.
+    back-off (2 s → 4 s → 8 s) on transient errors.
+
+    Only exceptions in ``retry_on`` (directly or as the ``__cause__`` of the
+    raised error) are retried; anything else, such as a ``ValueError`` from
+    input validation or a missing API key, propagates immediately.
 
     Usage::
 
@@ -85,24 +143,39 @@ def with_retries(func: F) -> F:
         def call_api() -> str:
             ...
 
+        @with_retries(retry_on=(TimeoutError,))
+        def call_other_api() -> str:
+            ...
+
     Args:
-        func: The callable to wrap.
+        func: The callable to wrap (omitted when called with keyword options).
+        retry_on: Exception types worth retrying. Defaults to
+            :func:`retryable_exceptions`; an empty tuple retries nothing.
 
     Returns:
-        The wrapped callable with retry logic applied.
+        The wrapped callable with retry logic applied, or a decorator when
+        ``func`` is omitted.
     """
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=8),
-        retry=retry_if_exception_type(Exception),
-        reraise=True,
-        before_sleep=before_sleep_log(_logger, logging.WARNING),
-    )
-    @functools.wraps(func)
-    def wrapper(*args: Any, **kwargs: Any) -> Any:
-        return func(*args, **kwargs)
+    def decorate(fn: F) -> F:
+        @retry(
+            stop=stop_after_attempt(3),
+            wait=wait_exponential(multiplier=1, min=2, max=8),
+            retry=retry_if_exception(lambda e: _is_retryable(e, retry_on)),
+            reraise=True,
+            before_sleep=before_sleep_log(_logger, logging.WARNING),
+        )
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return fn(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    if func is None:
+        return decorate
+    return decorate(func)
+
 
-    return wrapper  # type: ignore[return-value]
+_MAX_QUERY_LEN = 4000
 
 
 def validate_query(query: str) -> str:
@@ -118,9 +191,12 @@ def validate_query(query: str) -> str:
     Raises:
         ValueError: If the query is empty or exceeds 4000 characters.
     """
-    query = query.strip()
-    if not query:
+    # Already-trimmed input (the common case) skips the copy that strip() makes
+    if query and (query[0].isspace() or query[-1].isspace()):
+        query = query.strip()
+    n = len(query)
+    if not n:
         raise ValueError("Query must not be empty.")
-    if len(query) > 4000:
-        raise ValueError(f"Query too long ({len(query)} chars). Max is 4000.")
+    if n > _MAX_QUERY_LEN:
+        raise ValueError(f"Query too long ({n} chars). Max is {_MAX_QUERY_LEN}.")
     return query